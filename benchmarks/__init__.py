@@ -0,0 +1,59 @@
+"""
+Benchmarks for django_trees.
+
+These are not part of the test suite. Run a module from the project root, e.g.
+``python -m benchmarks.ascii_tree``, to print query counts and wall times.
+"""
+from __future__ import print_function
+import os
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
+
+
+def setup_database():
+    import django
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    if hasattr(django, 'setup'):
+        django.setup()
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def measure(func, *args, **kwargs):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.time()
+        func(*args, **kwargs)
+        elapsed = time.time() - start
+    return len(queries), elapsed
+
+
+def deep_tree(model, size):
+    root = node = model.objects.create(name='0')
+    for i in range(1, size):
+        node = model.objects.create(name=str(i), parent=node)
+    return root
+
+
+def wide_tree(model, size):
+    root = model.objects.create(name='0')
+    for i in range(1, size):
+        model.objects.create(name=str(i), parent=root)
+    return root
+
+
+def bulk_tree(model, size, fanout):
+    """Creates one tree of ``size`` nodes where each node has ``fanout`` children."""
+    objs = [model(name=str(i)) for i in range(size)]
+    pairs = [(obj, objs[(i - 1) // fanout] if i else None) for i, obj in enumerate(objs)]
+    model.objects.bulk_create_tree(pairs, batch_size=500)
+    return model.objects.get(_tree_id=objs[0]._tree_id, _depth=0)
+
+
+def report(label, queries, elapsed):
+    print('{:<40} {:>8} queries {:>10.4f}s'.format(label, queries, elapsed))
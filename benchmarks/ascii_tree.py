@@ -0,0 +1,36 @@
+"""
+Compares ``get_ascii_tree`` with the previous recursive rendering, which
+issued one ``get_children`` query per node.
+
+    python -m benchmarks.ascii_tree [size]
+"""
+from __future__ import print_function
+import sys
+
+from benchmarks import setup_database, measure, deep_tree, wide_tree, report
+
+
+def recursive_lines(node):
+    yield str(node)
+    children = list(node.get_children())
+    last = children[-1] if children else None
+    for child in children:
+        prefix = ' +-- '
+        for line in recursive_lines(child):
+            yield prefix + line
+            prefix = '     ' if child is last else ' |   '
+
+
+def main(size):
+    setup_database()
+    from django_trees.tests.test_app.models import Node
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), size * 4))
+    for shape, build in (('deep', deep_tree), ('wide', wide_tree)):
+        root = build(Node, size)
+        report('{} {} recursive'.format(shape, size), *measure(lambda: '\n'.join(recursive_lines(root))))
+        report('{} {} get_ascii_tree'.format(shape, size), *measure(root.get_ascii_tree))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
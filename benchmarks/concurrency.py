@@ -0,0 +1,97 @@
+"""
+Stress test for concurrent structural writes. Several threads insert, move
+and delete nodes in a few shared trees at the same time, after which every
+tree is checked for consistent edges, depths and parents.
+
+The in-memory test database cannot be shared between threads, so a file
+database is used. Pass ``--no-lock`` to run without the tree locks for
+comparison.
+
+    python -m benchmarks.concurrency [threads] [operations] [trees] [--no-lock]
+"""
+from __future__ import print_function
+import os
+import random
+import sys
+import tempfile
+import threading
+
+from benchmarks import setup_database
+
+
+def worker(model, tree_ids, operations, errors):
+    from django.db import connection, OperationalError
+    from django_trees.exceptions import InvalidNodeMove
+
+    try:
+        for i in range(operations):
+            nodes = list(model.objects.filter(_tree_id=random.choice(tree_ids)).order_by('?')[:2])
+            try:
+                operate(model, nodes, i)
+            except (model.DoesNotExist, InvalidNodeMove):
+                pass
+    except OperationalError as e:
+        errors.append(e)
+    finally:
+        connection.close()
+
+
+def operate(model, nodes, i):
+    action = random.random()
+    if action < 0.6 or len(nodes) < 2:
+        model.objects.create(name=str(i), parent=nodes[0])
+    elif action < 0.9:
+        nodes[0].move(nodes[1])
+    elif nodes[0]._depth:
+        nodes[0].delete()
+
+
+def problems(model, tree_id):
+    """Returns a description of everything wrong with the edges of the tree."""
+    nodes = list(model.objects.filter(_tree_id=tree_id).order_by('_left'))
+    found = []
+    edges = sorted([node._left for node in nodes] + [node._right for node in nodes])
+    if edges != list(range(1, 2 * len(nodes) + 1)):
+        found.append('edges are not 1..{}'.format(2 * len(nodes)))
+    path = []
+    for node in nodes:
+        while path and path[-1]._right < node._left:
+            path.pop()
+        parent = path[-1] if path else None
+        if node._parent_id != (parent and parent.pk) or node._depth != len(path):
+            found.append('{} is misplaced'.format(node.pk))
+        path.append(node)
+    return found
+
+
+def main(threads, operations, trees, lock=True):
+    from django.conf import settings
+
+    settings.DATABASES['default']['TEST_NAME'] = os.path.join(tempfile.mkdtemp(), 'concurrency.sqlite3')
+    setup_database()
+    from django_trees.managers import NodeManager
+    from django_trees.tests.test_app.models import Node
+
+    if not lock:
+        NodeManager._lock_trees = lambda self, tree_ids: None
+    roots = [Node.objects.create(name='root') for _ in range(trees)]
+    tree_ids = [root._tree_id for root in roots]
+    errors = []
+    workers = [
+        threading.Thread(target=worker, args=(Node, tree_ids, operations, errors)) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    print('{} threads x {} operations: {} nodes'.format(threads, operations, Node.objects.count()))
+    for error in errors:
+        print('error: {}'.format(error))
+    for tree_id in Node.objects.values_list('_tree_id', flat=True).distinct():
+        for problem in problems(Node, tree_id)[:5]:
+            print('tree {}: {}'.format(tree_id, problem))
+    print('done')
+
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg != '--no-lock']
+    main(*[int(arg) for arg in args[:3]] or [8, 200, 2], lock='--no-lock' not in sys.argv)
@@ -0,0 +1,69 @@
+"""
+Query plans and timings for descendant and ancestor lookups on a large table,
+with and without the composite tree indexes. Dropping the indexes for the
+comparison is only done on SQLite.
+
+    python -m benchmarks.indexes [rows] [trees]
+"""
+from __future__ import print_function
+import random
+import sys
+import time
+
+from benchmarks import setup_database, bulk_tree
+
+
+def explain(queryset, label):
+    from django.db import connection
+
+    sql, params = queryset.query.sql_with_params()
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    cursor = connection.cursor()
+    # the label keeps a cached statement from reporting the plan of the previous schema
+    cursor.execute('{}{} /* {} */'.format(prefix, sql, label), params)
+    return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+
+
+def time_lookups(nodes, lookup):
+    start = time.time()
+    for node in nodes:
+        list(getattr(node, lookup)())
+    return (time.time() - start) / len(nodes)
+
+
+def drop_composite_indexes(model):
+    from django.db import connection
+
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND sql LIKE %s",
+        [model._meta.db_table, '%,%'])
+    for name, in cursor.fetchall():
+        cursor.execute('DROP INDEX {}'.format(connection.ops.quote_name(name)))
+
+
+def run(label, nodes):
+    print(label)
+    for lookup in ('get_descendants', 'get_ancestors'):
+        print('  {:<16} {:>10.6f}s per lookup'.format(lookup, time_lookups(nodes, lookup)))
+        for line in explain(getattr(nodes[0], lookup)(), label):
+            print('    ' + line)
+
+
+def main(rows, trees):
+    setup_database()
+    from django.db import connection
+    from django_trees.tests.test_app.models import Node
+
+    for _ in range(trees):
+        bulk_tree(Node, rows // trees, 4)
+    candidates = list(Node.objects.all()[:rows // trees])
+    nodes = random.sample(candidates, min(50, len(candidates)))
+    run('composite indexes', nodes)
+    if connection.vendor == 'sqlite':
+        drop_composite_indexes(Node)
+        run('single column indexes only', nodes)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]] or [1000000, 10])
@@ -0,0 +1,58 @@
+"""
+Descendant and ancestor lookups on deep trees, comparing the nested-set edge
+queries of ``Node`` with the materialized path queries of ``PathNode``.
+
+    python -m benchmarks.materialized_path [trees] [depth]
+"""
+from __future__ import print_function
+import random
+import sys
+import time
+
+from benchmarks import setup_database
+from benchmarks.indexes import explain
+
+
+def deep_trees(model, trees, depth):
+    """Creates ``trees`` chains of ``depth`` nodes with one ``bulk_create_tree`` call."""
+    pairs = []
+    for _ in range(trees):
+        parent = None
+        for level in range(depth):
+            obj = model(name=str(level))
+            pairs.append((obj, parent))
+            parent = obj
+    model.objects.bulk_create_tree(pairs, batch_size=500)
+
+
+def time_lookups(nodes, lookup, refresh):
+    start = time.time()
+    for node in nodes:
+        list(getattr(node, lookup)(refresh=refresh))
+    return (time.time() - start) / len(nodes)
+
+
+def run(model, depth):
+    print(model.__name__)
+    candidates = list(model.objects.filter(_depth__in=[0, depth // 2, depth - 1]))
+    nodes = random.sample(candidates, min(60, len(candidates)))
+    middle = model.objects.filter(_depth=depth // 2)[0]
+    for lookup in ('get_descendants', 'get_ancestors'):
+        for refresh in (False, True):
+            label = '{}(refresh={})'.format(lookup, refresh)
+            print('  {:<30} {:>10.6f}s per lookup'.format(label, time_lookups(nodes, lookup, refresh)))
+        for line in explain(getattr(middle, lookup)(), model.__name__):
+            print('    ' + line)
+
+
+def main(trees, depth):
+    setup_database()
+    from django_trees.tests.test_app.models import Node, PathNode
+
+    for model in (Node, PathNode):
+        deep_trees(model, trees, depth)
+        run(model, depth)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]] or [5000, 40])
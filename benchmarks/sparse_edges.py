@@ -0,0 +1,47 @@
+"""
+Average number of existing rows each insert updates as the tree grows, with
+dense edges and with ``edge_gap``, per doubling of the tree and amortized over
+every insert so far.
+
+    python -m benchmarks.sparse_edges [size]
+"""
+from __future__ import print_function
+import sys
+
+from benchmarks import setup_database
+
+
+def edges(model):
+    return dict((pk, (left, right)) for pk, left, right in model.objects.values_list('pk', '_left', '_right'))
+
+
+def rows_updated(model, parent):
+    before = edges(model)
+    node = model.objects.create(name='new', parent=parent)
+    after = edges(model)
+    return node, sum(1 for pk, value in before.items() if after[pk] != value)
+
+
+def main(size):
+    setup_database()
+    from django_trees.tests.test_app.models import Node, SparseNode
+
+    print('{:<12} {:>10} {:>18} {:>12} {:>16}'.format(
+        'model', 'tree size', 'avg rows updated', 'amortized', 'inserts with 0'))
+    for model in (Node, SparseNode):
+        parents = [model.objects.create(name='root')]
+        bucket, total = [], 0
+        while len(parents) < size:
+            node, updated = rows_updated(model, parents[len(parents) // 4])
+            parents.append(node)
+            bucket.append(updated)
+            total += updated
+            if len(parents) & (len(parents) - 1) == 0 or len(parents) == size:
+                print('{:<12} {:>10} {:>18.1f} {:>12.1f} {:>16}'.format(
+                    model.__name__, len(parents), float(sum(bucket)) / len(bucket),
+                    float(total) / (len(parents) - 1), bucket.count(0)))
+                bucket = []
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
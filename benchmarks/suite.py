@@ -0,0 +1,145 @@
+"""
+Times and counts the queries of the structural operations on generated trees
+of several shapes and sizes, and optionally saves the results as JSON so runs
+on different commits can be compared.
+
+Shapes: ``straight`` is a single chain, ``bushy`` gives every node up to 50
+children, ``deep`` is a chain forking every 10 nodes and ``random`` hangs each
+node from a random earlier one. Each tree is bulk created, then every
+operation runs once against it. The ASCII rendering grows with the depth of
+every line, so it is skipped for trees deeper than ``ASCII_MAX_DEPTH``.
+
+    python -m benchmarks.suite [--sizes 10 100 ... 1000000] [--shapes ...]
+                               [--postgres DBNAME] [--output results.json]
+                               [--compare baseline.json]
+
+``--postgres`` runs against a local PostgreSQL database instead of SQLite,
+connecting with the usual ``PG*`` environment variables.
+"""
+from __future__ import print_function
+import argparse
+import collections
+import json
+import platform
+import random
+import subprocess
+import time
+
+from benchmarks import measure, report, setup_database
+
+SHAPES = {
+    'straight': lambda i: i - 1,
+    'bushy': lambda i: (i - 1) // 50,
+    'deep': lambda i: i - 1 if i % 10 else i - 10,
+    'random': lambda i: random.randrange(i),
+}
+SIZES = [10, 100, 1000, 10000]
+ASCII_MAX_DEPTH = 1000
+
+
+def tree_pairs(model, shape, size):
+    random.seed(size)
+    objs = [model(name=str(i)) for i in range(size)]
+    return [(obj, objs[SHAPES[shape](i)] if i else None) for i, obj in enumerate(objs)]
+
+
+def operations(model, objs):
+    """
+    The operations in the order they run, lookups before writes, each on a
+    node picked by its place in the generated order.
+    """
+    from django.db.models import Max
+
+    def pick(fraction):
+        obj = objs[min(len(objs) - 1, int(len(objs) * fraction))]
+        return model.objects.get(_tree_id=obj._tree_id, _left=obj._left)
+
+    root, leaf, parent, mover, splitter, doomed = [pick(f) for f in (0, 1, 0.5, 0.66, 0.33, 0.75)]
+    depth = model.objects.filter(_tree_id=root._tree_id).aggregate(depth=Max('_depth'))['depth']
+    return [
+        ('ancestors', lambda: list(leaf.get_ancestors())),
+        ('descendants', lambda: list(root.get_descendants())),
+    ] + [
+        ('ascii', lambda: collections.deque(root.iter_ascii_tree(), maxlen=0)),
+    ] * (depth <= ASCII_MAX_DEPTH) + [
+        ('create', lambda: model.objects.create(name='new', parent=parent)),
+        ('move', lambda: mover.move(root)),
+        ('bifurcate', splitter.bifurcate),
+        ('delete', doomed.delete),
+    ]
+
+
+def run_tree(model, shape, size):
+    from django.db import connection
+
+    pairs = tree_pairs(model, shape, size)
+    timings = [('create_tree',) + measure(model.objects.bulk_create_tree, pairs, batch_size=500)]
+    timings.extend((operation,) + measure(func) for operation, func in operations(model, [obj for obj, _ in pairs]))
+    connection.cursor().execute('DELETE FROM {}'.format(connection.ops.quote_name(model._meta.db_table)))
+    return [
+        dict(shape=shape, size=size, operation=operation, queries=queries, seconds=elapsed)
+        for operation, queries, elapsed in timings]
+
+
+def environment():
+    import django
+    from django.db import connection
+
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD']).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return dict(
+        commit=commit, database=connection.vendor, django=django.get_version(),
+        python=platform.python_version(), time=time.strftime('%Y-%m-%dT%H:%M:%S'))
+
+
+def compare(results, path):
+    """Prints the time of each result relative to the same one in a saved run."""
+    with open(path) as f:
+        baseline = dict((_key(result), result) for result in json.load(f)['results'])
+    for result in results:
+        old = baseline.get(_key(result))
+        if old and old['seconds']:
+            print('{:<40} {:>8} queries (was {:>6}) {:>8.2f}x time'.format(
+                ' '.join(map(str, _key(result))), result['queries'], old['queries'],
+                result['seconds'] / old['seconds']))
+
+
+def _key(result):
+    return result['shape'], result['size'], result['operation']
+
+
+def main(args):
+    from django.conf import settings
+
+    if args.postgres:
+        settings.DATABASES['default'] = dict(ENGINE='django.db.backends.postgresql_psycopg2', NAME=args.postgres)
+    setup_database()
+    from django_trees.tests.test_app.models import Node
+
+    results = []
+    for shape in args.shapes:
+        for size in args.sizes:
+            for result in run_tree(Node, shape, size):
+                report('{shape} {size} {operation}'.format(**result), result['queries'], result['seconds'])
+                results.append(result)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(dict(environment=environment(), results=results), f, indent=2, sort_keys=True)
+    if args.compare:
+        compare(results, args.compare)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the structural operations of django_trees.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--shapes', nargs='+', choices=sorted(SHAPES), default=sorted(SHAPES))
+    parser.add_argument('--postgres', metavar='DBNAME', help='benchmark a local PostgreSQL database')
+    parser.add_argument('--output', help='save the results as JSON')
+    parser.add_argument('--compare', metavar='JSON', help='compare with the results of an earlier run')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    main(parse_args())
@@ -0,0 +1,55 @@
+"""
+Row, index and lookup cost of uuid string tree ids against compact integer
+tree ids. Table and index sizes are read from SQLite's ``dbstat`` table.
+
+    python -m benchmarks.tree_ids [rows] [trees]
+"""
+from __future__ import print_function
+import random
+import sys
+import time
+
+from benchmarks import setup_database, bulk_tree
+
+
+def sizes(model):
+    from django.db import connection
+
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT name, SUM(pgsize) FROM dbstat WHERE name IN "
+        "(SELECT name FROM sqlite_master WHERE tbl_name = %s) GROUP BY name",
+        [model._meta.db_table])
+    table, indexes = 0, 0
+    for name, size in cursor.fetchall():
+        if name == model._meta.db_table:
+            table += size
+        else:
+            indexes += size
+    return table, indexes
+
+
+def lookup_time(model, nodes):
+    start = time.time()
+    for node in nodes:
+        list(node.get_descendants())
+        list(node.get_ancestors())
+    return (time.time() - start) / len(nodes)
+
+
+def main(rows, trees):
+    setup_database()
+    from django_trees.tests.test_app.models import Node, CompactNode
+
+    print('{:<12} {:>14} {:>14} {:>16}'.format('model', 'table bytes', 'index bytes', 'lookup seconds'))
+    for model in (Node, CompactNode):
+        for _ in range(trees):
+            bulk_tree(model, rows // trees, 4)
+        candidates = list(model.objects.all()[:rows // trees])
+        nodes = random.sample(candidates, min(50, len(candidates)))
+        table, indexes = sizes(model)
+        print('{:<12} {:>14} {:>14} {:>16.6f}'.format(model.__name__, table, indexes, lookup_time(model, nodes)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]] or [1000000, 10])
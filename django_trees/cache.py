@@ -0,0 +1,97 @@
+import threading
+from collections import defaultdict
+from itertools import takewhile
+
+_local = threading.local()
+
+
+class TreeCache(object):
+    """
+    Keeps whole trees in memory for the duration of a ``with`` block so that
+    ancestor, descendant, children and sibling lookups on a tree cost a single
+    query. Structural writes made through ``NodeManager`` drop the trees they
+    touch. Cached lookups return lists rather than querysets.
+    """
+
+    def __init__(self):
+        self._trees = {}
+        self._nodes = {}
+
+    def __enter__(self):
+        _stack().append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _stack().remove(self)
+
+    @staticmethod
+    def active():
+        stack = _stack()
+        return stack[-1] if stack else None
+
+    def tree(self, node):
+        """
+        Returns the cached tree of ``node``, loading it first if needed, or
+        ``None`` when the node's row no longer exists.
+        """
+        model = type(node)
+        if (model, node.pk) not in self._nodes:
+            nodes = list(model.objects._tree_of(node))
+            if not nodes:
+                return None
+            tree = CachedTree(nodes)
+            self._trees[model, tree.tree_id] = tree
+            self._nodes.update(((model, pk), tree) for pk in tree.positions)
+        return self._nodes[model, node.pk]
+
+    def invalidate(self, model, tree_ids):
+        dropped = [self._trees.pop((model, tree_id)) for tree_id in tree_ids if (model, tree_id) in self._trees]
+        for tree in dropped:
+            for pk in tree.positions:
+                del self._nodes[model, pk]
+
+
+class CachedTree(object):
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.tree_id = nodes[0]._tree_id
+        self.positions = dict((node.pk, position) for position, node in enumerate(nodes))
+        self.children = defaultdict(list)
+        for node in nodes:
+            self.children[node._parent_id].append(node)
+
+    def get(self, pk):
+        return self.nodes[self.positions[pk]]
+
+    def ancestors(self, pk):
+        ancestors = []
+        node = self.get(pk)
+        while node._parent_id is not None:
+            node = self.get(node._parent_id)
+            ancestors.append(node)
+        return ancestors
+
+    def descendants(self, pk):
+        position = self.positions[pk]
+        right = self.nodes[position]._right
+        return list(takewhile(lambda node: node._left < right, self.nodes[position + 1:]))
+
+    def siblings(self, pk):
+        return [node for node in self.children[self.get(pk)._parent_id] if node.pk != pk]
+
+    def adjacent_sibling(self, pk, offset):
+        siblings = self.children[self.get(pk)._parent_id]
+        position = siblings.index(self.get(pk)) + offset
+        return siblings[position] if 0 <= position < len(siblings) else None
+
+
+def invalidate(model, tree_ids):
+    for cache in _stack():
+        cache.invalidate(model, tree_ids)
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
@@ -0,0 +1,212 @@
+from collections import defaultdict
+from django.db import models, transaction
+from django.db.models.signals import pre_save, post_save
+from django_trees import signals
+from django_trees.exceptions import InvalidNodeMove, UnsupportedAction
+from django_trees.managers import NodeManager, SIBLING_POSITIONS, _depth_bounds
+
+
+class ClosureNodeManager(NodeManager):
+    """
+    Stores the tree in a closure table instead of nested-set edges: a link
+    model with one row for every ancestor/descendant pair, including each node
+    with itself at distance ``0``. Inserts and moves only touch the links of
+    the affected subtree, never the rest of the tree.
+
+    ``move``, ``bifurcate``, ``delete`` and the ancestor, descendant, children
+    and sibling lookups work as with ``NodeManager``, but descendants come
+    back level by level rather than in nested-set order. Edges are not
+    maintained, so ``iter_tree``, ``get_ascii_tree``, ``bulk_create_tree``,
+    ``delay_tree_updates``, ``prefetch_trees``, ``export_tree``,
+    ``import_tree``, ``copy_to``, ``copy_as_new_tree`` and ``TreeCache`` are
+    not available.
+    """
+
+    def __init__(self, tree_id_type='uuid'):
+        super(ClosureNodeManager, self).__init__(tree_id_type=tree_id_type)
+        self.link_model = None
+
+    def bulk_create_tree(self, nodes, parent=None, batch_size=None):
+        raise UnsupportedAction("bulk_create_tree needs nested-set edges.")
+
+    def iter_tree(self, root):
+        raise UnsupportedAction("iter_tree needs nested-set edges.")
+
+    def check_tree(self, tree_id):
+        raise UnsupportedAction("check_tree needs nested-set edges.")
+
+    def rebuild(self, tree_id):
+        raise UnsupportedAction("rebuild needs nested-set edges.")
+
+    def delay_tree_updates(self):
+        raise UnsupportedAction("Closure trees have no edges to delay.")
+
+    def prefetch_trees(self, nodes):
+        raise UnsupportedAction("prefetch_trees needs nested-set edges.")
+
+    def export_tree(self, tree_id, stream):
+        raise UnsupportedAction("export_tree needs nested-set edges.")
+
+    def import_tree(self, stream, batch_size=500):
+        raise UnsupportedAction("import_tree needs nested-set edges.")
+
+    def _copy_subtree(self, node, new_parent):
+        raise UnsupportedAction("Copying a subtree needs nested-set edges.")
+
+    def _leaf_count_sql(self):
+        return 'COUNT(*) - COUNT(DISTINCT {parent})'
+
+    def descendant_count(self, node):
+        return self._links().filter(ancestor=node, distance__gt=0).count()
+
+    def delete_subtree(self, node):
+        """
+        Deletes ``node``, its descendants and their links with two ``DELETE``
+        statements. No delete signals are sent and nothing is cascaded to
+        other models, and the primary key of ``node`` is set to ``None``. The
+        subtree is read through a derived table, since MySQL does not let a
+        ``DELETE`` read the table it deletes from directly.
+        """
+        names = self._sql_names()
+        subtree = '(SELECT {descendant} FROM (SELECT {descendant} FROM {links} WHERE {ancestor} = %s) subtree)'.format(
+            **names)
+        with transaction.atomic(using=self._write_db()):
+            self._lock_trees_of(node)
+            cursor = self._connection().cursor()
+            cursor.execute('DELETE FROM {table} WHERE {pk} IN '.format(**names) + subtree, [node.pk])
+            cursor.execute('DELETE FROM {links} WHERE {descendant} IN '.format(**names) + subtree, [node.pk])
+        setattr(node, self.model._meta.pk.attname, None)
+
+    def ancestors_of(self, nodes):
+        return self._linked_to_each(nodes, 'descendant', 'ancestor')
+
+    def descendants_of(self, nodes):
+        return self._linked_to_each(nodes, 'ancestor', 'descendant')
+
+    def _linked_to_each(self, nodes, ref, related):
+        linked = defaultdict(list)
+        links = self._links().filter(**{ref + '__in': nodes, 'distance__gt': 0})
+        for link in links.select_related(related).order_by('distance', related):
+            linked[getattr(link, ref + '_id')].append(getattr(link, related))
+        return linked
+
+    def _tree_models(self):
+        return (self.model, self.link_model)
+
+    def _children(self, node):
+        return self.filter(_parent=node)
+
+    def _siblings(self, node):
+        return self.filter(_parent__in=self.filter(pk=node.pk).values('_parent')).exclude(pk=node.pk)
+
+    def _ancestors(self, node, refresh=False):
+        return self.filter(
+            pk__in=self._links().filter(descendant=node, distance__gt=0).values('ancestor')).order_by('-_depth')
+
+    def _descendants(self, node, refresh=False, min_depth=None, max_depth=None):
+        links = self._links().filter(ancestor=node, distance__gt=0).filter(**dict(
+            ('distance__' + lookup, offset) for lookup, offset in _depth_bounds(min_depth, max_depth)))
+        return self.filter(pk__in=links.values('descendant')).order_by('_depth', 'pk')
+
+    def _adjacent_sibling(self, node, offset):
+        if offset > 0:
+            return self._siblings(node).filter(pk__gt=node.pk).order_by('pk').first()
+        return self._siblings(node).filter(pk__lt=node.pk).order_by('-pk').first()
+
+    def _insert_node(self, node):
+        if node.__dict__.pop('_insert_position', None):
+            raise UnsupportedAction("Closure trees keep no sibling order.")
+        if node.parent:
+            parent = self._lock_trees_of(node.parent)[node.parent.pk]
+            node._depth = parent._depth + 1
+            node._tree_id = parent._tree_id
+
+    def _link_node(self, node):
+        self._connection().cursor().execute((
+            'INSERT INTO {links} ({ancestor}, {descendant}, {distance}) '
+            'SELECT {ancestor}, %s, {distance} + 1 FROM {links} WHERE {descendant} = %s '
+            'UNION ALL SELECT %s, %s, 0'
+        ).format(**self._sql_names()), [node.pk, node._parent_id, node.pk, node.pk])
+
+    def _move_node(self, node, new_parent, position='first-child'):
+        """
+        Moves ``node`` and its descendants under ``new_parent``, or into a
+        tree of their own when it is ``None``, by replacing the links between
+        the subtree and its old ancestors with links to the new ones. Closure
+        trees keep no sibling order, so ``position`` can only place the node
+        as a child.
+        """
+        if position in SIBLING_POSITIONS:
+            raise UnsupportedAction("Closure trees keep no sibling order.")
+        with transaction.atomic(using=self._write_db()):
+            node, new_parent = self._fetch_for_move(node, new_parent)
+            if new_parent and self._links().filter(ancestor=node, descendant=new_parent).exists():
+                raise InvalidNodeMove()
+            self._execute_update([
+                ('{tree_id} = %s', [new_parent._tree_id if new_parent else self._new_tree_id()]),
+                ('{depth} = {depth} + %s', [(new_parent._depth + 1 if new_parent else 0) - node._depth]),
+                ('{parent} = CASE WHEN {pk} = %s THEN %s ELSE {parent} END', [node.pk, new_parent and new_parent.pk]),
+            ], '{pk} IN (SELECT {descendant} FROM {links} WHERE {ancestor} = %s)', [node.pk])
+            self._detach_links(node)
+            if new_parent:
+                self._attach_links(node, new_parent)
+
+    def _detach_links(self, node):
+        self._connection().cursor().execute((
+            'DELETE FROM {links} WHERE {descendant} IN '
+            '(SELECT {descendant} FROM (SELECT {descendant} FROM {links} WHERE {ancestor} = %s) subtree) '
+            'AND {ancestor} IN (SELECT {ancestor} FROM '
+            '(SELECT {ancestor} FROM {links} WHERE {descendant} = %s AND {distance} > 0) above)'
+        ).format(**self._sql_names()), [node.pk, node.pk])
+
+    def _attach_links(self, node, parent):
+        self._connection().cursor().execute((
+            'INSERT INTO {links} ({ancestor}, {descendant}, {distance}) '
+            'SELECT up.{ancestor}, down.{descendant}, up.{distance} + down.{distance} + 1 '
+            'FROM {links} up, {links} down WHERE up.{descendant} = %s AND down.{ancestor} = %s'
+        ).format(**self._sql_names()), [parent.pk, node.pk])
+
+    def _links(self):
+        return self.link_model._default_manager.db_manager(self._write_db())
+
+    def _sql_names(self):
+        qn = self._connection().ops.quote_name
+        opts = self.link_model._meta
+        names = super(ClosureNodeManager, self)._sql_names()
+        names.update(
+            links=qn(opts.db_table),
+            ancestor=qn(opts.get_field('ancestor').column),
+            descendant=qn(opts.get_field('descendant').column),
+            distance=qn('distance'),
+        )
+        return names
+
+    def _add_tree_fields(self, model):
+        super(ClosureNodeManager, self)._add_tree_fields(model)
+        self.link_model = _create_link_model(model)
+
+    def _connect_signals(self, model):
+        pre_save.connect(signals.pre_save_node, model)
+        post_save.connect(signals.post_save_node, model)
+
+
+def _create_link_model(model):
+    """
+    Builds the ``<Model>Link`` closure table for ``model`` the way Django
+    builds the through model of a many-to-many field.
+    """
+    opts = model._meta
+    to = '{}.{}'.format(opts.app_label, opts.object_name)
+    meta = type('Meta', (object,), {
+        'app_label': opts.app_label,
+        'db_table': '{}_link'.format(opts.db_table),
+        'unique_together': [('ancestor', 'descendant')],
+        'index_together': [('descendant', 'distance')],
+    })
+    return type('{}Link'.format(opts.object_name), (models.Model,), {
+        '__module__': model.__module__,
+        'Meta': meta,
+        'ancestor': models.ForeignKey(to, related_name='+'),
+        'descendant': models.ForeignKey(to, related_name='+'),
+        'distance': models.IntegerField(),
+    })
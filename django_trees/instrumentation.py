@@ -0,0 +1,162 @@
+"""
+Optional instrumentation of tree operations. Once ``enable`` is called, every
+``move``, ``bifurcate``, node insert and delete, ``get_ancestors``,
+``get_descendants`` and ``get_ascii_tree`` sends ``tree_operation`` with the
+number of queries it ran, the rows they wrote and the wall time it took, and
+the module level ``stats`` adds them up per model and operation.
+
+A lookup returning a queryset is reported once the queryset is evaluated,
+adding the queries run then to those of the call itself.
+"""
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.query import QuerySet
+from django.dispatch import Signal
+
+tree_operation = Signal(providing_args=['operation', 'queries', 'rows', 'seconds'])
+
+_local = threading.local()
+_enabled = [False]
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class TreeStats(object):
+    """
+    Totals of the operations reported through ``tree_operation``, keyed by
+    ``'app_label.ModelName'`` and operation name.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def record(self, sender, operation, queries, rows, seconds, **kwargs):
+        label = '{}.{}'.format(sender._meta.app_label, sender._meta.object_name)
+        with self._lock:
+            totals = self._totals[label][operation]
+            for key, value in (('calls', 1), ('queries', queries), ('rows', rows), ('seconds', seconds)):
+                totals[key] += value
+
+    def snapshot(self):
+        """Returns a copy of the totals as plain dicts, ready for ``json.dumps``."""
+        with self._lock:
+            return dict(
+                (label, dict((operation, dict(totals)) for operation, totals in operations.items()))
+                for label, operations in self._totals.items())
+
+    def reset(self):
+        with self._lock:
+            self._totals = defaultdict(lambda: defaultdict(lambda: dict(calls=0, queries=0, rows=0, seconds=0.0)))
+
+
+stats = TreeStats()
+
+
+def enable():
+    _enabled[0] = True
+    tree_operation.connect(stats.record, dispatch_uid='django_trees.instrumentation.stats')
+
+
+def disable():
+    _enabled[0] = False
+    tree_operation.disconnect(dispatch_uid='django_trees.instrumentation.stats')
+
+
+def instrumented(operation):
+    """
+    Measures the decorated model method or signal handler as ``operation``
+    while instrumentation is enabled. The model is taken from the ``sender``
+    of a signal or the node a method is called on. An unevaluated queryset
+    returned by the method carries the measurement along, for its
+    ``_fetch_all`` to report.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled[0]:
+                return func(*args, **kwargs)
+            with Measurement() as measurement:
+                result = func(*args, **kwargs)
+            if isinstance(result, QuerySet) and result._result_cache is None:
+                return result._clone(_measured=(operation, measurement))
+            report(kwargs['sender'] if 'sender' in kwargs else type(args[0]), operation, measurement)
+            return result
+        return wrapper
+    return decorator
+
+
+def report(sender, operation, *measurements):
+    tree_operation.send(
+        sender=sender, operation=operation, queries=sum(measurement.queries for measurement in measurements),
+        rows=sum(measurement.rows for measurement in measurements),
+        seconds=sum(measurement.seconds for measurement in measurements))
+
+
+class Measurement(object):
+    """
+    Counts the queries run on the default connection and the rows they write
+    for the duration of a ``with`` block. Blocks may nest, the outermost one
+    puts the counting cursor in place.
+    """
+
+    def __init__(self):
+        self.queries = self.rows = 0
+        self.seconds = 0.0
+
+    def __enter__(self):
+        measurements = _measurements()
+        if not measurements:
+            db = connections[DEFAULT_DB_ALIAS]
+            db.cursor = lambda: CountingCursor(type(db).cursor(db))
+        measurements.append(self)
+        self.started = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds = time.time() - self.started
+        measurements = _measurements()
+        measurements.remove(self)
+        if not measurements:
+            del connections[DEFAULT_DB_ALIAS].cursor
+
+    def count(self, sql, rowcount):
+        self.queries += 1
+        if sql.lstrip()[:6].upper() in WRITE_STATEMENTS:
+            self.rows += max(rowcount, 0)
+
+
+class CountingCursor(object):
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __getattr__(self, attr):
+        return getattr(self.cursor, attr)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def execute(self, sql, params=None):
+        try:
+            return self.cursor.execute(sql, params)
+        finally:
+            self._count(sql)
+
+    def executemany(self, sql, param_list):
+        try:
+            return self.cursor.executemany(sql, param_list)
+        finally:
+            self._count(sql)
+
+    def _count(self, sql):
+        for measurement in _measurements():
+            measurement.count(sql, self.cursor.rowcount)
+
+
+def _measurements():
+    if not hasattr(_local, 'measurements'):
+        _local.measurements = []
+    return _local.measurements
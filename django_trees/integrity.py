@@ -0,0 +1,91 @@
+from collections import defaultdict
+
+
+class TreeChecker(object):
+    """
+    Checks the nodes of one tree, fed in ``_left`` order, against their
+    ``_parent`` links. Only the current path is kept in memory. With
+    ``dense`` the edges must also be consecutive.
+    """
+
+    def __init__(self, dense=True):
+        self.dense = dense
+        self.path = []
+        self.edge = 0
+        self.roots = 0
+        self.problems = []
+
+    def visit(self, node):
+        self._close(node._left)
+        self._expect_edge(node, '_left', node._left)
+        parent = self.path[-1] if self.path else None
+        self._check_links(node, parent)
+        self._check_right(node, parent)
+        self.path.append(node)
+
+    def finish(self):
+        self._close(float('inf'))
+        if self.roots != 1:
+            self.problems.append('tree has {} roots'.format(self.roots))
+        return self.problems
+
+    def _close(self, edge):
+        while self.path and self.path[-1]._right < edge:
+            node = self.path.pop()
+            self._expect_edge(node, '_right', node._right)
+
+    def _expect_edge(self, node, column, value):
+        if self.dense and value != self.edge + 1:
+            self._report(node, '{} is {}, expected {}', column, value, self.edge + 1)
+        elif value <= self.edge:
+            self._report(node, '{} is {}, expected more than {}', column, value, self.edge)
+        self.edge = value
+
+    def _check_links(self, node, parent):
+        self.roots += parent is None
+        if node._parent_id != (parent and parent.pk):
+            self._report(node, '_parent is {}, edges put it under {}', node._parent_id, parent and parent.pk)
+        if node._depth != len(self.path):
+            self._report(node, '_depth is {}, expected {}', node._depth, len(self.path))
+
+    def _check_right(self, node, parent):
+        if node._right <= node._left or (parent and node._right >= parent._right):
+            self._report(node, '_right {} does not fit between _left {} and its parent', node._right, node._left)
+
+    def _report(self, node, message, *args):
+        self.problems.append('node {}: '.format(node.pk) + message.format(*args))
+
+
+class Row(object):
+    """
+    The tree columns of one node as loaded for a check or rebuild,
+    remembering the stored values so only changed rows are written back.
+    """
+    __slots__ = ('pk', '_parent_id', '_tree_id', '_left', '_right', '_depth', 'stored')
+
+    def __init__(self, pk, parent_id, tree_id, left, right, depth):
+        self.pk = pk
+        self._parent_id = parent_id
+        self._tree_id, self._left, self._right, self._depth = self.stored = (tree_id, left, right, depth)
+
+    @property
+    def changed(self):
+        return (self._tree_id, self._left, self._right, self._depth) != self.stored
+
+
+def nest_rows(rows):
+    """
+    Nests ``rows`` by their ``_parent_id`` as ``(row, children)`` items,
+    keeping siblings in the order given. Rows whose parent is not among them
+    become top level items. Children are generated lazily, so deep trees do
+    not hit the recursion limit.
+    """
+    children = defaultdict(list)
+    for row in rows:
+        children[row._parent_id].append(row)
+    pks = set(row.pk for row in rows)
+
+    def item(row):
+        return row, (item(child) for child in children[row.pk])
+
+    return [item(row) for row in rows if row._parent_id not in pks]
@@ -0,0 +1,52 @@
+import multiprocessing
+from optparse import make_option
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import get_model
+
+
+class Command(BaseCommand):
+    args = '<app_label.ModelName ...>'
+    help = 'Checks every tree of the given node models and rebuilds the broken ones from their parent links.'
+    option_list = BaseCommand.option_list + (
+        make_option('--check', action='store_true', dest='check', default=False,
+                    help='Only report problems, do not rebuild.'),
+        make_option('--processes', type='int', dest='processes', default=multiprocessing.cpu_count(),
+                    help='Number of worker processes, defaults to the number of CPUs.'),
+    )
+
+    def handle(self, *labels, **options):
+        jobs = [(label, tree_id, options['check']) for label in labels for tree_id in _tree_ids(label)]
+        # forked workers must open their own database connections
+        connection.close()
+        pool = multiprocessing.Pool(options['processes']) if options['processes'] > 1 else None
+        results = pool.imap_unordered(repair_tree, jobs, chunksize=16) if pool else map(repair_tree, jobs)
+        broken = rebuilt = 0
+        for label, tree_id, problems, changed in results:
+            for problem in problems:
+                self.stdout.write('{} tree {}: {}'.format(label, tree_id, problem))
+            broken += bool(problems)
+            rebuilt += bool(changed)
+        if pool:
+            pool.close()
+            pool.join()
+        self.stdout.write('{} trees checked, {} broken, {} rebuilt'.format(len(jobs), broken, rebuilt))
+
+
+def repair_tree(job):
+    label, tree_id, check_only = job
+    manager = _model(label).objects
+    problems = manager.check_tree(tree_id)
+    changed = manager.rebuild(tree_id) if problems and not check_only else 0
+    return label, tree_id, problems, changed
+
+
+def _tree_ids(label):
+    return _model(label).objects.values_list('_tree_id', flat=True).distinct()
+
+
+def _model(label):
+    model = get_model(*label.split('.', 1)) if '.' in label else None
+    if model is None:
+        raise CommandError('Unknown model: {}'.format(label))
+    return model
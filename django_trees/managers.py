@@ -1,91 +1,1276 @@
+import itertools
+import json
+import operator
+import random
+import threading
 import uuid
-from django.db.models.signals import pre_save, pre_delete
-from django_trees.exceptions import InvalidNodeMove
-from django_trees import signals
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+from django.db import connections, router, transaction
+from django.db.models.signals import pre_save, pre_delete, post_delete
+from django_trees.exceptions import InvalidNodeMove, UnsupportedAction
+from django_trees import cache, instrumentation, signals
+from django_trees.integrity import Row, TreeChecker, nest_rows
 from django.db import models
+from django.db.models.query import QuerySet
+from django.db.models.sql.datastructures import EmptyResultSet
+from django.core.serializers.json import DjangoJSONEncoder
+
+TreeInfo = namedtuple('TreeInfo', 'level is_leaf is_last_sibling open_levels close_levels')
+TreeSummary = namedtuple('TreeSummary', 'node_count max_depth leaf_count')
+OpenNode = namedtuple('OpenNode', 'tree_id right pk child_path')
+
+LINK_BATCH_SIZE = 500
+REBUILD_BATCH_SIZE = 100
+MAX_EDGE = 2 ** 31 - 1
+PENDING_EDGE = 2 ** 30
+MIN_EDGES_PER_NODE = 6
+POSITION_EDGES = {
+    'first-child': lambda target: target._left + 1,
+    'last-child': lambda target: target._right,
+    'before': lambda target: target._left,
+    'after': lambda target: target._right + 1,
+}
+SIBLING_POSITIONS = ('before', 'after')
+DEPTH_OPERATORS = {'gte': (operator.ge, '>='), 'lte': (operator.le, '<=')}
+PATH_PREFIX_CONDITIONS = {
+    'sqlite': "{table}.{path} >= ({prefix} || '/') AND {table}.{path} < ({prefix} || '0')",
+    'postgresql': "{table}.{path} ~>=~ ({prefix} || '/') AND {table}.{path} ~<~ ({prefix} || '0')",
+}
+PATH_PREFIX_LIKE = "{table}.{path} LIKE ({prefix} || '/%%')"
+TREE_FIELDS = (
+    '_parent', '_tree_id', '_left', '_right', '_depth', '_deleting', '_path',
+    '_tree_size', '_tree_max_depth', '_tree_leaf_count',
+)
+TREE_INDEXES = (
+    ('_tree_id', '_left'),
+    ('_tree_id', '_right'),
+    ('_tree_id', '_depth', '_left'),
+    ('_parent', '_left'),
+)
 
 
 class NodeManager(models.Manager):
 
-    def _move_node(self, node, new_parent):
-        original_tree_id = node._tree_id
-        node = self.get(pk=node.pk)
-        if new_parent in list(node.get_descendants()) + [node]:
+    def __init__(self, edge_gap=0, tree_id_type='uuid', materialized_path=False, tree_summary=False):
+        """
+        ``edge_gap`` reserves that many unused edge values inside each new node
+        so later children fit without renumbering the rest of the tree. The
+        default of ``0`` keeps the edges dense.
+
+        ``tree_id_type`` picks the ``_tree_id`` column: ``'uuid'`` stores uuid4
+        strings, ``'int'`` stores random 63 bit integers which keep rows and
+        the tree indexes much smaller.
+
+        ``materialized_path`` adds an indexed ``_path`` column holding the
+        primary keys of each node's ancestors, e.g. ``'1/5/'``, which
+        ``get_descendants`` and ``get_ancestors`` then look up instead of
+        comparing edges.
+
+        ``tree_summary`` keeps the node count, maximum depth and leaf count of
+        each tree on its root row for ``tree_stats``.
+        """
+        super(NodeManager, self).__init__()
+        self.edge_gap = edge_gap
+        self.tree_id_type = tree_id_type
+        self.materialized_path = materialized_path
+        self.tree_summary = tree_summary
+
+    def renumber_tree_ids(self):
+        """
+        Rewrites every tree id as a small integer, one ``UPDATE`` per tree, so
+        an existing ``_tree_id`` column of uuid strings can afterwards be
+        converted to an integer column and used with ``tree_id_type='int'``.
+        Trees already numbered ``1`` to the tree count keep their id and the
+        others take the free numbers, so no tree is given an id another tree
+        still holds and running it again changes nothing.
+        """
+        with transaction.atomic(using=self._write_db()):
+            tree_ids = list(self.values_list('_tree_id', flat=True).distinct().order_by('_tree_id'))
+            self._lock_trees(tree_ids)
+            for tree_id, number in _renumbered_tree_ids(tree_ids):
+                self.filter(_tree_id=tree_id).update(_tree_id=str(number))
+        return len(tree_ids)
+
+    def tree_stats(self, tree_ids=None):
+        """
+        Returns a ``TreeSummary`` of the node count, maximum depth and leaf
+        count of each of the given trees, or of every tree, keyed by tree id.
+        The trees are counted together in one aggregate query per batch of
+        tree ids. With ``tree_summary`` the counts are read from the root rows
+        instead, and only trees changed since they were counted are recounted.
+        """
+        if not self.tree_summary:
+            return self._count_trees(tree_ids)
+        roots = [
+            (root[0], TreeSummary(*root[1:4]), root[4]) for root in self._roots(tree_ids).values_list(
+                '_tree_id', '_tree_size', '_tree_max_depth', '_tree_leaf_count', 'pk')]
+        summaries = dict((tree_id, summary) for tree_id, summary, _ in roots)
+        stale = dict((tree_id, pk) for tree_id, summary, pk in roots if summary.node_count is None)
+        if stale:
+            summaries.update(self._recount_trees(stale))
+        return summaries
+
+    def _roots(self, tree_ids):
+        if tree_ids is None:
+            return self.filter(_depth=0)
+        return self.filter(_depth=0, _tree_id__in=list(tree_ids))
+
+    def _count_trees(self, tree_ids=None):
+        select = 'SELECT {tree_id}, COUNT(*), MAX({depth}), ' + self._leaf_count_sql() + ' FROM {table} '
+        if tree_ids is None:
+            queries = [(select + 'GROUP BY {tree_id}', [])]
+        else:
+            queries = [
+                (select + 'WHERE {tree_id} IN (' + ', '.join(['%s'] * len(batch)) + ') GROUP BY {tree_id}', batch)
+                for batch in _batches(list(tree_ids), LINK_BATCH_SIZE)]
+        cursor = self._connection().cursor()
+        counts = {}
+        for sql, params in queries:
+            cursor.execute(sql.format(**self._sql_names()), params)
+            counts.update((row[0], TreeSummary(*row[1:])) for row in cursor.fetchall())
+        return counts
+
+    def _leaf_count_sql(self):
+        if self.edge_gap:
+            return 'COUNT(*) - COUNT(DISTINCT {parent})'
+        return 'SUM(CASE WHEN {right} = {left} + 1 THEN 1 ELSE 0 END)'
+
+    def _recount_trees(self, roots):
+        """
+        Counts the trees of ``roots``, a mapping of tree id to root pk, under
+        their locks and stores the counts on the root rows.
+        """
+        with transaction.atomic(using=self._write_db()):
+            self._lock_trees(roots)
+            counts = self._count_trees(roots)
+            for batch in _batches(list(counts.items()), REBUILD_BATCH_SIZE):
+                self._execute_update(
+                    [_value_case(column, [(roots[tree_id], getattr(summary, attr)) for tree_id, summary in batch])
+                     for column, attr in (
+                         ('{tree_size}', 'node_count'), ('{tree_max_depth}', 'max_depth'),
+                         ('{tree_leaf_count}', 'leaf_count'))],
+                    '{pk} IN (' + ', '.join(['%s'] * len(batch)) + ')', [roots[tree_id] for tree_id, _ in batch])
+        return counts
+
+    def _count_insert(self, node, parent):
+        """
+        Adds a new leaf under ``parent`` to the summary on the root row. The
+        leaf count only grows when the parent already had children, which is
+        looked up first: MySQL does not let the ``UPDATE`` read the table it
+        writes, and the tree lock keeps the answer current.
+        """
+        had_children = self.filter(_parent=parent).exists()
+        self._execute_update([
+            ('{tree_size} = {tree_size} + 1', []),
+            ('{tree_max_depth} = CASE WHEN {tree_max_depth} < %s THEN %s ELSE {tree_max_depth} END',
+             [node._depth, node._depth]),
+            ('{tree_leaf_count} = {tree_leaf_count} + %s', [int(had_children)]),
+        ], '{tree_id} = %s AND {depth} = 0', [parent._tree_id])
+
+    def _summaries_changed(self, tree_ids):
+        """
+        Marks the summaries of the trees stale after a move, delete or
+        rebuild, for ``tree_stats`` to recount.
+        """
+        if self.tree_summary:
+            self._execute_update(
+                [('{tree_size} = NULL', [])],
+                '{depth} = 0 AND {tree_id} IN (' + ', '.join(['%s'] * len(tree_ids)) + ')', list(tree_ids))
+
+    def check_tree(self, tree_id):
+        """
+        Validates the edges and depths of the tree against the ``_parent``
+        links in one streaming pass and returns a list of the problems found,
+        which is empty when the tree is consistent.
+        """
+        checker = TreeChecker(dense=not self.edge_gap)
+        for values in self._tree_columns([tree_id]).iterator():
+            checker.visit(Row(*values))
+        return checker.finish()
+
+    def rebuild(self, tree_id):
+        """
+        Recomputes the edges and depths of the tree from the ``_parent``
+        links, keeping siblings in their current order, and writes back only
+        the rows that changed, in batches. Returns the number of rows changed.
+        """
+        return self._rebuild([tree_id])
+
+    def _rebuild(self, tree_ids):
+        """
+        Rebuilds the given trees together, so nodes whose ``_parent`` now
+        lies in another of them, or which head a tree of their own, take the
+        tree id of the root they hang from. Trees holding the parent of one of
+        their nodes are rebuilt along, and a node left without a parent, even
+        by corruption, heads a new tree instead of becoming a second root.
+        """
+        tree_ids = set(tree_ids)
+        with transaction.atomic(using=self._write_db()):
+            rows = self._rows_to_rebuild(tree_ids)
+            changed = [
+                row for tree_id, item in self._plant(nest_rows(rows))
+                for row in _number_nodes([item], 1, 0, tree_id) if row.changed]
+            for batch in _batches(changed, REBUILD_BATCH_SIZE):
+                self._write_edges(batch)
+            tree_ids.update(row._tree_id for row in changed)
+            self._summaries_changed(tree_ids)
+        cache.invalidate(self.model, tree_ids)
+        return len(changed)
+
+    def _rows_to_rebuild(self, tree_ids):
+        """
+        Locks and reads the trees, adding the trees that hold the parent of
+        one of their nodes to ``tree_ids`` until every parent is read along.
+        Links to parents whose row is gone are cleared.
+        """
+        rows, pending = [], set(tree_ids)
+        while pending:
+            self._lock_trees(pending)
+            rows.extend(Row(*values) for values in self._tree_columns(pending))
+            outside = set(row._parent_id for row in rows) - set(row.pk for row in rows) - set([None])
+            pending = set(tree_id for batch in _batches(list(outside), LINK_BATCH_SIZE)
+                          for tree_id in self.filter(pk__in=batch).values_list('_tree_id', flat=True)) - tree_ids
+            tree_ids.update(pending)
+        orphans = [row for row in rows if row._parent_id in outside]
+        for batch in _batches(orphans, LINK_BATCH_SIZE):
+            self.filter(pk__in=[row.pk for row in batch]).update(_parent=None)
+        for row in orphans:
+            row._parent_id = None
+        return sorted(rows, key=operator.attrgetter('_left'))
+
+    def _plant(self, items):
+        """
+        Pairs the top level items with the trees they head. The recorded root
+        of a tree keeps its tree id, and any other item claiming the same one
+        gets a new tree.
+        """
+        taken = set()
+        for item in sorted(items, key=lambda item: item[0]._depth != 0):
+            tree_id = item[0]._tree_id if item[0]._tree_id not in taken else self._new_tree_id()
+            taken.add(tree_id)
+            yield tree_id, item
+
+    def _tree_columns(self, tree_ids):
+        return self.filter(_tree_id__in=tree_ids).order_by('_left').values_list(
+            'pk', '_parent', '_tree_id', '_left', '_right', '_depth')
+
+    def _write_edges(self, rows):
+        self._execute_update(
+            [_value_case(column, [(row.pk, getattr(row, attr)) for row in rows])
+             for column, attr in (
+                 ('{tree_id}', '_tree_id'), ('{left}', '_left'), ('{right}', '_right'), ('{depth}', '_depth'))],
+            '{pk} IN (' + ', '.join(['%s'] * len(rows)) + ')', [row.pk for row in rows])
+
+    @contextmanager
+    def delay_tree_updates(self):
+        """
+        Defers edge maintenance until the end of the block, which runs in a
+        transaction. Inserts and moves inside it only write the row of the
+        node itself, deletes go through Django's collector, and on exit every
+        touched tree is rebuilt once from the ``_parent`` links. Until then
+        edge based lookups on those trees are stale, and inserts and moves
+        next to a sibling are not available. Nested blocks join the outer one.
+        """
+        if self.materialized_path:
+            raise UnsupportedAction("Delayed updates do not maintain materialized paths.")
+        if self._delayed():
+            yield
+            return
+        delays = _delayed_updates.__dict__.setdefault('models', {})
+        delayed = delays[self.model] = DelayedUpdates()
+        try:
+            with transaction.atomic(using=self._write_db()):
+                yield
+                self._rebuild(delayed.tree_ids)
+        finally:
+            del delays[self.model]
+
+    def _delayed(self):
+        return getattr(_delayed_updates, 'models', {}).get(self.model)
+
+    def bulk_create_tree(self, nodes, parent=None, batch_size=None):
+        """
+        Inserts unsaved nodes with their edges computed in Python.
+
+        ``nodes`` is either a nested list of ``(obj, children)`` tuples or a flat
+        list of ``(obj, parent_ref)`` pairs where ``parent_ref`` is another object
+        from the list or ``None``. Top level nodes become new trees, or children
+        of ``parent`` when it is given. Like ``bulk_create`` no save signals are
+        sent and primary keys are only set where the backend returns them.
+        """
+        if _is_pairs(nodes):
+            nodes = _nest_pairs(nodes)
+        with transaction.atomic(using=self._write_db()):
+            if parent is None:
+                objs = self._number_new_trees(nodes)
+            else:
+                objs = self._number_grafted_nodes(nodes, parent)
+            self.bulk_create(objs, batch_size=batch_size)
+            self._link_inserted(objs)
+        return objs
+
+    def _number_new_trees(self, nodes):
+        objs = []
+        for item in nodes:
+            objs.extend(_number_nodes([item], 1, 0, self._new_tree_id()))
+        return objs
+
+    def _number_grafted_nodes(self, nodes, parent):
+        parent = self._lock_trees_of(parent)[parent.pk]
+        objs = _number_nodes(nodes, parent._right, parent._depth + 1, parent._tree_id)
+        for obj, _ in nodes:
+            obj._parent = parent
+        self._open_gap(parent._tree_id, parent._right, len(objs) * 2)
+        self._summaries_changed([parent._tree_id])
+        cache.invalidate(self.model, [parent._tree_id])
+        return objs
+
+    def _link_inserted(self, objs):
+        """
+        Links the rows of the freshly bulk inserted ``objs``, which are either
+        whole new trees or one run of edges grafted under their first
+        object's ``_parent``.
+        """
+        parent = objs and objs[0]._parent
+        if parent:
+            self._link_rows(self.filter(
+                _tree_id=parent._tree_id, _left__gte=objs[0]._left, _left__lte=objs[-1]._left), parent)
+            return
+        for batch in _batches(sorted(set(obj._tree_id for obj in objs)), LINK_BATCH_SIZE):
+            self._link_rows(self.filter(_tree_id__in=batch))
+
+    def _link_rows(self, rows, parent=None):
+        """
+        Points ``_parent`` of bulk inserted ``rows`` at the node directly above
+        them, and fills in their ``_path``, since the inserted parents had no
+        primary key in Python. Top level rows hang from ``parent`` when it is
+        given. The rows are read back in edge order with a stack of the nodes
+        still open and the links are written in batches, so no statement
+        reads the table it updates, which MySQL rejects.
+        """
+        path = _child_path(parent) if self.materialized_path else ''
+        above = [OpenNode(parent._tree_id, MAX_EDGE, parent.pk, path)] if parent else []
+        links = []
+        for pk, tree_id, left, right in rows.order_by('_tree_id', '_left').values_list(
+                'pk', '_tree_id', '_left', '_right').iterator():
+            enclosing = _enclosing(above, tree_id, left)
+            path = enclosing.child_path if enclosing else ''
+            if enclosing:
+                links.append((pk, enclosing.pk, path))
+            above.append(OpenNode(tree_id, right, pk, path + str(pk) + '/'))
+            links = self._write_links(links, REBUILD_BATCH_SIZE)
+        self._write_links(links, 0)
+
+    def _write_links(self, links, batch_size):
+        """Writes ``links`` once there are more than ``batch_size`` of them and returns the ones still pending."""
+        if len(links) <= batch_size:
+            return links
+        assignments = [_value_case('{parent}', [(pk, parent) for pk, parent, _ in links])]
+        if self.materialized_path:
+            assignments.append(_value_case('{path}', [(pk, path) for pk, _, path in links]))
+        pks = [pk for pk, _, _ in links]
+        self._execute_update(assignments, '{pk} IN (' + ', '.join(['%s'] * len(pks)) + ')', pks)
+        return []
+
+    def export_tree(self, tree_id, stream):
+        """
+        Writes the tree to ``stream`` as lines of JSON: a header naming the
+        model and its fields, then one ``[depth, value, ...]`` array per node
+        in ``_left`` order. Rows are streamed from the database, so the tree
+        is never held in memory. Returns the number of nodes written.
+        """
+        fields = _exported_fields(self.model)
+        header = {'model': self.model._meta.object_name, 'fields': [field.name for field in fields]}
+        stream.write(json.dumps(header, sort_keys=True) + '\n')
+        rows = self.filter(_tree_id=tree_id).order_by('_left').values_list('_depth', *[f.attname for f in fields])
+        count = 0
+        for count, row in enumerate(rows.iterator(), 1):
+            stream.write(json.dumps(row, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n')
+        return count
+
+    def import_tree(self, stream, batch_size=500):
+        """
+        Creates a new tree from the lines ``export_tree`` wrote. Edges are
+        numbered while reading, and each node is written in ``bulk_create``
+        batches once its subtree is complete, so only the current path and
+        one batch are kept in memory. Returns the new root.
+        """
+        fields = [self.model._meta.get_field(name) for name in json.loads(next(stream))['fields']]
+        tree_id = self._new_tree_id()
+        edges = itertools.count(1)
+        path, done, depths = [], [], set()
+        with transaction.atomic(using=self._write_db()):
+            for number, line in enumerate(stream, 2):
+                row = json.loads(line)
+                done.extend(_close_nodes(path, row[0], edges))
+                if len(path) != row[0] or (not path and depths):
+                    raise ValueError("Line {}: depth {} does not follow the previous node.".format(number, row[0]))
+                path.append(self.model(_tree_id=tree_id, _depth=row[0], _left=next(edges), **dict(
+                    (field.attname, field.to_python(value)) for field, value in zip(fields, row[1:]))))
+                depths.add(row[0])
+                done = self._write_batch(done, batch_size)
+            if not depths:
+                raise ValueError("The stream holds no nodes.")
+            self._write_batch(done + _close_nodes(path, 0, edges), 0)
+            self._link_rows(self.filter(_tree_id=tree_id))
+        return self.get(_tree_id=tree_id, _depth=0)
+
+    def _write_batch(self, objs, batch_size):
+        """Writes ``objs`` once there are more than ``batch_size`` of them and returns the ones still pending."""
+        if len(objs) <= batch_size:
+            return objs
+        self.bulk_create(objs)
+        return []
+
+    def descendant_count(self, node):
+        """
+        Counts the descendants of ``node`` from its current edges without
+        loading them. Sparse edges fall back to a ``COUNT`` of the subtree.
+        """
+        if self.edge_gap:
+            return self._subtree(node).count() - 1
+        left, right = self.filter(pk=node.pk).values_list('_left', '_right')[0]
+        return _descendant_count(left, right)
+
+    def delete_subtree(self, node):
+        """
+        Deletes ``node`` and its descendants with a single ``DELETE`` of their
+        edge range and closes the gap they leave. No delete signals are sent
+        and nothing is cascaded to other models. As with ``Model.delete`` the
+        primary key of ``node`` is set to ``None`` afterwards.
+        """
+        if self._delayed():
+            raise UnsupportedAction("delete_subtree needs current edges, use delete inside delay_tree_updates.")
+        with transaction.atomic(using=self._write_db()):
+            current = self._lock_trees_of(node)[node.pk]
+            self._connection().cursor().execute(
+                'DELETE FROM {table} WHERE {tree_id} = %s AND {left} BETWEEN %s AND %s'.format(**self._sql_names()),
+                [current._tree_id, current._left, current._right])
+            self._renumber_source_tree_for_subtree_deletion(current)
+        setattr(node, self.model._meta.pk.attname, None)
+
+    def _can_delete_subtree(self):
+        """
+        A subtree may bypass Django's collector when only this app listens for
+        deletes and no other model or many-to-many table points at the nodes.
+        Inside ``delay_tree_updates`` the edges are stale, so the collector is
+        used.
+        """
+        if self._delayed():
+            return False
+        receivers = pre_delete._live_receivers(self.model) + post_delete._live_receivers(self.model)
+        opts = self.model._meta
+        related = [
+            rel for rel in opts.get_all_related_objects(include_hidden=True) if rel.model not in self._tree_models()]
+        return not (
+            related or opts.many_to_many or opts.get_all_related_many_to_many_objects() or
+            any(receiver is not signals.pre_delete_node for receiver in receivers))
+
+    def get_queryset(self):
+        return NodeQuerySet(self.model, using=self._db)
+
+    def prefetch_tree(self):
+        return self.get_queryset().prefetch_tree()
+
+    def prefetch_trees(self, nodes):
+        """
+        Loads the nodes around ``nodes`` with one query per tree: everything
+        from the first of them to the end of the last, and their ancestors.
+        Afterwards ``parent`` is answered from memory, and so are
+        ``get_children``, ``get_ancestors`` and ``get_descendants`` of every
+        node whose subtree was loaded whole, including ``nodes`` themselves.
+        Like ``prefetch_related`` the results are not updated by later writes.
+        """
+        by_tree = defaultdict(list)
+        for node in nodes:
+            by_tree[node._tree_id].append(node)
+        for tree_id, tree_nodes in by_tree.items():
+            self._prefetch_tree(tree_id, tree_nodes)
+        return nodes
+
+    def _prefetch_tree(self, tree_id, nodes):
+        low, high = min(node._left for node in nodes), max(node._right for node in nodes)
+        given = dict((node.pk, node) for node in nodes)
+        loaded = [given.get(row.pk, row) for row in self.filter(
+            models.Q(_left__range=(low, high)) | models.Q(_left__lt=low, _right__gt=low),
+            _tree_id=tree_id).order_by('_left')]
+        tree = cache.CachedTree(loaded)
+        parent_cache = self.model._meta.get_field('_parent').get_cache_name()
+        for node in loaded:
+            if node._parent_id is None or node._parent_id in tree.positions:
+                setattr(node, parent_cache, node._parent_id and tree.get(node._parent_id))
+            if low <= node._left and node._right <= high:
+                node._prefetched_tree = tree
+
+    def _tree_models(self):
+        return (self.model,)
+
+    def iter_tree(self, root):
+        """
+        Streams ``root`` and its descendants in tree order as ``(node, info)``
+        pairs, where ``info`` is a ``TreeInfo`` giving the node's level below
+        ``root``, whether it is a leaf or the last of its siblings, how many
+        levels open before it and how many close after it. Rows are read with
+        ``iterator()`` and only the current path is kept, so memory does not
+        grow with the tree.
+        """
+        path = []
+        pending = None
+        for node in self._tree_rows(root).iterator():
+            while path and path[-1]._right < node._left:
+                path.pop()
+            last = self._is_last_sibling(node, path[-1] if path else None)
+            path.append(node)
+            if pending:
+                yield _tree_info(pending, node._depth)
+            pending = (node, last, int(not pending or node._depth > pending[0]._depth), path[0]._depth)
+        if pending:
+            yield _tree_info(pending, pending[3] - 1)
+
+    def _tree_rows(self, root):
+        rows = self._subtree(root)
+        if self.edge_gap:
+            rows = rows.extra(select={'_last_sibling': (
+                'NOT EXISTS (SELECT 1 FROM {table} sibling WHERE sibling.{parent} = {table}.{parent} '
+                'AND sibling.{tree_id} = {table}.{tree_id} AND sibling.{left} > {table}.{left})'
+            ).format(**self._sql_names())})
+        return rows
+
+    def _is_last_sibling(self, node, parent):
+        if parent is None:
+            return True
+        if self.edge_gap:
+            return bool(node._last_sibling)
+        return node._right + 1 == parent._right
+
+    def ancestors_of(self, nodes):
+        """
+        Returns the ancestors of each of ``nodes`` (a queryset or list) in one
+        query, as a mapping of node pk to a list ordered from the parent up.
+        """
+        return self._related_to_each(nodes, 'node.{left} < ref.{left} AND node.{right} > ref.{right}', 'node.{right}')
+
+    def descendants_of(self, nodes):
+        """
+        Returns the descendants of each of ``nodes`` in one query, as a mapping
+        of node pk to a list in tree order.
+        """
+        return self._related_to_each(nodes, 'node.{left} > ref.{left} AND node.{left} < ref.{right}', 'node.{left}')
+
+    def children_of(self, nodes):
+        """
+        Returns the children of each of ``nodes`` in one query, as a mapping of
+        node pk to a list in tree order.
+        """
+        children = defaultdict(list)
+        for child in self.filter(_parent__in=nodes).order_by('_left'):
+            children[child._parent_id].append(child)
+        return children
+
+    def _related_to_each(self, nodes, condition, order):
+        related = defaultdict(list)
+        pks_sql, params = _pks_sql(nodes)
+        if pks_sql:
+            sql = (
+                'SELECT node.*, ref.{pk} AS _related_to FROM {table} node JOIN {table} ref '
+                'ON ref.{tree_id} = node.{tree_id} AND ' + condition + ' '
+                'WHERE ref.{pk} IN (' + pks_sql + ') ORDER BY ref.{pk}, ' + order
+            ).format(**self._sql_names())
+            for node in self.raw(sql, params):
+                related[node._related_to].append(node)
+        return related
+
+    def _children(self, node):
+        tree = self._cached_tree(node)
+        if tree:
+            return list(tree.children[node.pk])
+        return self.filter(_parent=node)
+
+    def _siblings(self, node):
+        tree_cache = cache.TreeCache.active()
+        tree = tree_cache and tree_cache.tree(node)
+        if tree:
+            return tree.siblings(node.pk)
+        return self._filter_by_node(
+            node, '{table}.{parent} = ref.{parent} AND {table}.{pk} <> ref.{pk}').order_by('_left')
+
+    def _ancestors(self, node, refresh=False):
+        tree = self._cached_tree(node)
+        if tree and not refresh:
+            return tree.ancestors(node.pk)
+        if self.materialized_path:
+            return self._ancestors_by_path(node)
+        if refresh:
+            current_node = self.get(pk=node.pk)
+            return self.filter(
+                _left__lt=current_node._left, _right__gt=current_node._right,
+                _tree_id=current_node._tree_id).order_by('_right')
+        return self._filter_by_node(
+            node, '{table}.{left} < ref.{left} AND {table}.{right} > ref.{right}').order_by('_right')
+
+    def _descendants(self, node, refresh=False, min_depth=None, max_depth=None):
+        bounds = _depth_bounds(min_depth, max_depth)
+        tree = self._cached_tree(node)
+        if tree and not refresh:
+            return _within_depths(tree.descendants(node.pk), tree.get(node.pk)._depth, bounds)
+        if refresh:
+            current_node = self.get(pk=node.pk)
+            return self._current_descendants(current_node).filter(**dict(
+                ('_depth__' + lookup, current_node._depth + offset) for lookup, offset in bounds))
+        return self._filter_by_node(
+            node, self._descendant_condition() + ''.join(
+                ' AND {table}.{depth} ' + DEPTH_OPERATORS[lookup][1] + ' ref.{depth} + %s' for lookup, _ in bounds),
+            [offset for _, offset in bounds], same_tree=not self.materialized_path).order_by('_left')
+
+    def _descendant_condition(self):
+        """
+        The join condition matching the descendants of the ``ref`` row: a
+        prefix of its ``_path`` with ``materialized_path``, else its edges.
+        """
+        if not self.materialized_path:
+            return '{table}.{left} > ref.{left} AND {table}.{left} < ref.{right}'
+        condition = PATH_PREFIX_CONDITIONS.get(self._connection().vendor, PATH_PREFIX_LIKE)
+        return condition.replace('{prefix}', 'ref.{path} || ref.{pk}')
+
+    def _current_descendants(self, node):
+        if self.materialized_path:
+            return self._descendants_by_path(node)
+        return self.filter(_left__gt=node._left, _right__lt=node._right, _tree_id=node._tree_id).order_by('_left')
+
+    def level(self, tree_id, depth, after=None):
+        """
+        Returns the nodes at ``depth`` in the tree in edge order. Pass the last
+        node of the previous page as ``after`` to page through a large level
+        by its ``_left`` edge rather than with an ``OFFSET``.
+        """
+        nodes = self.filter(_tree_id=tree_id, _depth=depth).order_by('_left')
+        return nodes.filter(_left__gt=after._left) if after else nodes
+
+    def _cached_tree(self, node):
+        """
+        The tree of ``node`` held by an active ``TreeCache``, or else the one
+        ``prefetch_trees`` attached to the instance.
+        """
+        tree_cache = cache.TreeCache.active()
+        if tree_cache:
+            return tree_cache.tree(node)
+        return node.__dict__.get('_prefetched_tree')
+
+    def _move_node(self, node, target, position='first-child'):
+        """
+        Moves ``node`` and its descendants to ``position`` relative to
+        ``target``, or into a tree of their own when ``target`` is ``None``,
+        with a fixed number of queries whatever the size of the subtree.
+        """
+        if self._delayed():
+            return self._move_node_later(node, target, position)
+        with transaction.atomic(using=self._write_db()):
+            node, target = self._fetch_for_move(node, target)
+            if target and _is_within(target, node):
+                raise InvalidNodeMove()
+            parent, edge = self._destination(target, position)
+            cache.invalidate(self.model, [node._tree_id, target and target._tree_id])
+            if target is None:
+                self._move_subtree(node, self._new_tree_id(), edge, None)
+            elif target._tree_id == node._tree_id:
+                self._move_within_tree(node, parent, edge)
+            else:
+                self._open_gap(target._tree_id, edge, _width(node))
+                self._move_subtree(node, target._tree_id, edge, parent)
+
+    def _move_node_later(self, node, target, position):
+        """
+        Hangs ``node`` from ``target`` by its own row alone and leaves its
+        descendants to the rebuild. The pending ``_left`` sorts it before or
+        after the existing children, in the order of the calls.
+        """
+        if position not in ('first-child', 'last-child'):
+            raise UnsupportedAction("Only moves to a child position can be delayed.")
+        node, target = self._fetch_for_move(node, target)
+        if target and self._hangs_from(target, node):
             raise InvalidNodeMove()
-        self._detach_subtree(node)
-        node = self.get(pk=node.pk)
-        self._renumber_source_tree_edges(original_tree_id, node)
-        self._renumber_detached_tree_edges(new_parent, node)
-        if new_parent:
-            self._renumber_source_tree_for_subtree_insertion(new_parent, node)
-            self._attach_subtree(new_parent, node)
+        delayed = self._delayed()
+        left = -next(delayed.edges) if position == 'first-child' else PENDING_EDGE + next(delayed.edges)
+        tree_id = target._tree_id if target else self._new_tree_id()
+        delayed.touch(node._tree_id, tree_id)
+        cache.invalidate(self.model, [node._tree_id, tree_id])
+        self.filter(pk=node.pk).update(
+            _parent=target, _tree_id=tree_id, _depth=target._depth + 1 if target else 0, _left=left, _right=left)
+
+    def _hangs_from(self, node, ancestor):
+        """
+        Follows the ``_parent`` links up from ``node``, which unlike the edges
+        are current inside ``delay_tree_updates``.
+        """
+        pk = node.pk
+        while pk is not None and pk != ancestor.pk:
+            pk = self.filter(pk=pk).values_list('_parent', flat=True)[0]
+        return pk is not None
+
+    def _destination(self, target, position):
+        """
+        Returns the parent and the left edge a node gets when placed at
+        ``position`` relative to the current edges of ``target``.
+        """
+        if target is None:
+            return None, 1
+        if position not in POSITION_EDGES:
+            raise ValueError("Unknown position: {}".format(position))
+        if position in SIBLING_POSITIONS and target._parent_id is None:
+            raise InvalidNodeMove("A root node has no siblings.")
+        parent = self.get(pk=target._parent_id) if position in SIBLING_POSITIONS else target
+        return parent, POSITION_EDGES[position](target)
 
     def _bifurcate(self, node_to_bifurcate):
         self._move_node(node_to_bifurcate, None)
-        self.filter(pk=node_to_bifurcate.pk).update(_parent=None)
-        node = self.get(pk=node_to_bifurcate.pk)
-        self.filter(_tree_id=node._tree_id).update(_depth=models.F('_depth') - node_to_bifurcate._depth)
+
+    def _copy_subtree(self, node, new_parent):
+        """
+        Copies ``node`` and its descendants to the last child position of
+        ``new_parent``, or into a new tree when it is None, and returns the
+        copy of ``node``. The source is read with one query and the copies go
+        through ``bulk_create_tree``, so the target tree is shifted once.
+        """
+        if self._delayed():
+            raise UnsupportedAction("Copies need current edges and cannot be delayed.")
+        fields = [field.attname for field in _exported_fields(self.model)]
+        with transaction.atomic(using=self._write_db()):
+            node, new_parent = self._fetch_for_move(node, new_parent)
+            copies, pairs = {}, []
+            for row in self._subtree(node).values_list('pk', '_parent', *fields):
+                copies[row[0]] = self.model(**dict(zip(fields, row[2:])))
+                pairs.append((copies[row[0]], copies.get(row[1])))
+            objs = self.bulk_create_tree(pairs, new_parent)
+        return self.get(_tree_id=objs[0]._tree_id, _left=objs[0]._left)
+
+    def _fetch_for_move(self, node, new_parent):
+        nodes = self._lock_trees_of(node, new_parent)
+        return nodes[node.pk], new_parent and nodes[new_parent.pk]
+
+    def _lock_trees_of(self, *nodes):
+        """
+        Locks the trees of ``nodes`` until the end of the transaction and
+        returns the nodes re-read under the lock, keyed by pk. Should a node
+        have moved to another tree in the meantime, that tree is locked too.
+        """
+        pks = [node.pk for node in nodes if node is not None]
+        tree_ids = set(node._tree_id for node in nodes if node is not None)
+        locked, fresh = set(), {}
+        while tree_ids - locked:
+            self._lock_trees(tree_ids - locked)
+            locked |= tree_ids
+            fresh = self.in_bulk(pks)
+            tree_ids = set(node._tree_id for node in fresh.values())
+        if len(fresh) < len(set(pks)):
+            raise self.model.DoesNotExist("{} matching query does not exist.".format(self.model._meta.object_name))
+        return fresh
+
+    def _lock_trees(self, tree_ids):
+        """
+        Rewrites the root rows of the trees in place, one tree at a time in id
+        order. This takes the row lock of ``SELECT ... FOR UPDATE``, or the
+        database write lock on SQLite, so concurrent structural writes to the
+        same tree queue up while writes to other trees go ahead.
+        """
+        for tree_id in sorted(tree_ids):
+            self._execute_update([('{depth} = {depth}', [])], '{tree_id} = %s AND {depth} = 0', [tree_id])
+
+    def _move_within_tree(self, node, parent, position):
+        if position > node._right:
+            shifts = [
+                (node._left, node._right, position - 1 - node._right),
+                (node._right + 1, position - 1, -_width(node))]
+        else:
+            shifts = [
+                (node._left, node._right, position - node._left),
+                (position, node._left - 1, _width(node))]
+        self._shift_edges(node._tree_id, shifts, [
+            ('{depth} = CASE WHEN {left} BETWEEN %s AND %s THEN {depth} + %s ELSE {depth} END',
+             [node._left, node._right, parent._depth + 1 - node._depth]),
+            ('{parent} = CASE WHEN {pk} = %s THEN %s ELSE {parent} END', [node.pk, parent.pk]),
+        ] + self._path_assignments(node, parent, '{left} BETWEEN %s AND %s', [node._left, node._right]))
+        self._summaries_changed([node._tree_id])
+
+    def _adjacent_sibling(self, node, offset):
+        tree_cache = cache.TreeCache.active()
+        tree = tree_cache and tree_cache.tree(node)
+        if tree:
+            return tree.adjacent_sibling(node.pk, offset)
+        if offset > 0:
+            siblings = self._filter_by_node(
+                node, '{table}.{parent} = ref.{parent} AND {table}.{left} > ref.{right}').order_by('_left')
+        else:
+            siblings = self._filter_by_node(
+                node, '{table}.{parent} = ref.{parent} AND {table}.{right} < ref.{left}').order_by('-_left')
+        return siblings.first()
+
+    def _move_subtree(self, node, tree_id, left, parent):
+        depth = parent._depth + 1 if parent else 0
+        self._execute_update([
+            ('{tree_id} = %s', [tree_id]),
+            ('{depth} = {depth} + %s', [depth - node._depth]),
+            ('{parent} = CASE WHEN {pk} = %s THEN %s ELSE {parent} END', [node.pk, parent and parent.pk]),
+            ('{left} = {left} + %s', [left - node._left]),
+            ('{right} = {right} + %s', [left - node._left]),
+        ] + self._path_assignments(node, parent),
+            '{tree_id} = %s AND {left} BETWEEN %s AND %s', [node._tree_id, node._left, node._right])
+        self._summaries_changed([tree_id])
+        self._renumber_source_tree_for_subtree_deletion(node)
+
+    def _path_assignments(self, node, parent, condition='1 = 1', params=()):
+        """
+        Rewrites the ``_path`` prefix of ``node`` and its descendants for
+        their new ``parent``, limited to rows matching ``condition``.
+        """
+        if not self.materialized_path:
+            return []
+        return [(
+            '{path} = CASE WHEN ' + condition + ' THEN %s || SUBSTR({path}, %s) ELSE {path} END',
+            list(params) + [_child_path(parent), len(node._path) + 1])]
+
+    def _descendants_by_path(self, node):
+        """
+        Matches the ``_path`` prefix of the descendants of ``node``. SQLite
+        compares strings byte by byte, so there the prefix is matched as the
+        index range ``LIKE 'prefix%'`` stands for. Other databases sort by a
+        collation that may skip the ``/``, so they get the ``LIKE`` itself,
+        which PostgreSQL answers from the ``text_pattern_ops`` index Django
+        adds to the column.
+        """
+        prefix = _child_path(node)
+        if self._connection().vendor == 'sqlite':
+            return self.filter(_path__gte=prefix, _path__lt=prefix[:-1] + '0').order_by('_left')
+        return self.filter(_path__startswith=prefix).order_by('_left')
+
+    def _ancestors_by_path(self, node):
+        """
+        Looks up the primary keys in the current ``_path`` of ``node``, which
+        is re-read by primary key first so a stale instance gets its current
+        ancestors.
+        """
+        path = ''.join(self.filter(pk=node.pk).values_list('_path', flat=True))
+        return self.filter(pk__in=[pk for pk in path.split('/') if pk]).order_by('_right')
+
+    def _insert_node(self, node):
+        position = node.__dict__.pop('_insert_position', None)
+        if self._delayed() and (position or node.parent):
+            return self._insert_node_later(node, position)
+        if position:
+            return self._insert_node_at(node, *position)
+        if not node.parent:
+            return self._insert_root(node)
+        parent = self._lock_trees_of(node.parent)[node.parent.pk]
+        self._place_under(node, parent)
+        if self.edge_gap:
+            self._insert_node_into_gap(node, parent)
+        else:
+            node._left = parent._right
+            node._right = node._left + 1
+            self._renumber_source_tree_for_node_insertion(node)
+
+    def _insert_root(self, node):
+        node._right = node._left + 1 + self.edge_gap
+        if self.tree_summary:
+            node._tree_size, node._tree_max_depth, node._tree_leaf_count = 1, 0, 1
+
+    def _insert_node_later(self, node, position):
+        if position:
+            raise UnsupportedAction("Positional inserts cannot be delayed.")
+        parent = self._lock_trees_of(node.parent)[node.parent.pk]
+        self._place_under(node, parent)
+        node._left = node._right = PENDING_EDGE + next(self._delayed().edges)
+        self._delayed().touch(parent._tree_id)
+
+    def _insert_node_at(self, node, target, position):
+        """
+        Places ``node`` at ``position`` relative to ``target``, opening a gap
+        of one node's width there.
+        """
+        target = self._lock_trees_of(target)[target.pk]
+        parent, edge = self._destination(target, position)
+        self._place_under(node, parent)
+        node._parent = parent
+        node._left, node._right = edge, edge + 1 + self.edge_gap
+        self._open_gap(parent._tree_id, edge, _width(node))
+
+    def _place_under(self, node, parent):
+        node._depth = parent._depth + 1
+        node._tree_id = parent._tree_id
+        if self.materialized_path:
+            node._path = _child_path(parent)
+        if self.tree_summary:
+            self._count_insert(node, parent)
+        cache.invalidate(self.model, [parent._tree_id])
+
+    def _insert_node_into_gap(self, node, parent):
+        """
+        Places ``node`` in the free edge values after the parent's last child,
+        keeping half of them for later siblings. Only when they are used up
+        are the edges around the parent spread out again by ``_rebalance``.
+        """
+        last = self.filter(_parent=parent).aggregate(last=models.Max('_right'))['last'] or parent._left
+        free = parent._right - last - 1
+        if free < 2:
+            return self._rebalance(node, parent)
+        node._left = last + 1
+        node._right = node._left + 1 + min(self.edge_gap, (free - 2) // 2)
+
+    def _rebalance(self, node, parent):
+        """
+        Makes room for ``node`` as the last child of ``parent`` by spreading
+        the edges of the nearest enclosing subtree that is sparse enough
+        evenly over its own span, so rows outside it keep their edges. When
+        even the whole tree is too full the root is widened to twice the
+        edges its nodes need, which has nothing to its right to shift.
+        """
+        window, count = self._rebalance_window(parent)
+        rows = [Row(*values) for values in self.filter(
+            _tree_id=window._tree_id, _left__gte=window._left, _left__lte=window._right).order_by('_left').values_list(
+            'pk', '_parent', '_tree_id', '_left', '_right', '_depth')]
+        edges = sorted([(row._left, row, '_left') for row in rows] + [(row._right, row, '_right') for row in rows])
+        closing = next(position for position, (_, row, column) in enumerate(edges)
+                       if row.pk == parent.pk and column == '_right')
+        edges[closing:closing] = [(None, node, '_left'), (None, node, '_right')]
+        span = max(_width(window), 2 * count * self._edges_per_node(count)) if window._depth == 0 else _width(window)
+        for position, (_, item, column) in enumerate(edges):
+            setattr(item, column, window._left + position * (span - 1) // (len(edges) - 1))
+        for batch in _batches([row for row in rows if row.changed], REBUILD_BATCH_SIZE):
+            self._write_edges(batch)
+
+    def _rebalance_window(self, parent):
+        """
+        Returns the nearest ancestor of the new child of ``parent`` with
+        ``_edges_per_node`` edge values for each node below it, or the root,
+        and the number of nodes it will hold. Each ancestor only counts the
+        rows outside the one below it, so the rows counted are no more than
+        the rows the rebalance reads anyway.
+        """
+        count, inner = 1, None
+        ancestors = self.filter(_tree_id=parent._tree_id, _left__lte=parent._left, _right__gte=parent._right)
+        for window in ancestors.order_by('-_left'):
+            outside = self.filter(_tree_id=window._tree_id, _left__gte=window._left, _left__lte=window._right)
+            if inner:
+                outside = outside.exclude(_left__gte=inner._left, _left__lte=inner._right)
+            count, inner = count + outside.count(), window
+            if window._depth == 0 or _width(window) >= count * self._edges_per_node(count):
+                return window, count
+
+    def _edges_per_node(self, count):
+        """
+        The edge values a subtree of ``count`` nodes needs per node to be
+        rebalanced: the node's own two edges and its gap, at least two free
+        values after each edge, and two more for every doubling of ``count``.
+        Spreading a larger subtree thus leaves each smaller one inside it with
+        room to spare, so large rebalances stay rare.
+        """
+        return max(self.edge_gap + 2, MIN_EDGES_PER_NODE) + 2 * count.bit_length()
 
     def _renumber_source_tree_for_node_insertion(self, node):
-        self.filter(_left__gt=node._left, _tree_id=node._tree_id).update(_left=models.F('_left') + 2)
-        self.filter(_right__gte=node._left, _tree_id=node._tree_id).update(_right=models.F('_right') + 2)
-
-    def _renumber_source_tree_edges(self, tree_id, node):
-        delta = (len(self.get(pk=node.pk).get_descendants()) + 1) * -2
-        self._update_edges(
-            delta,
-            self.filter(_tree_id=tree_id, _left__gt=node._left),
-            self.filter(_tree_id=tree_id, _right__gt=node._left))
-
-    def _renumber_detached_tree_edges(self, parent, node):
-        left = self.get(pk=parent.pk)._left if parent else 0
-        delta = (left + 1) - node._left
-        self._update_edges(
-            delta,
-            self.filter(_tree_id=node._tree_id, _left__gte=node._left),
-            self.filter(_tree_id=node._tree_id, _right__gt=node._left))
-
-    def _renumber_source_tree_for_subtree_insertion(self, parent, node):
-        delta = (len(self.get(pk=node.pk).get_descendants()) + 1) * 2
-        parent = self.get(pk=parent.pk)
-        self._update_edges(
-            delta,
-            self.filter(_tree_id=parent._tree_id, _left__gt=parent._left),
-            self.filter(_tree_id=parent._tree_id, _right__gte=parent._left))
+        self._open_gap(node._tree_id, node._left, 2)
 
     def _renumber_source_tree_for_subtree_deletion(self, node):
-        delta = (len(node.get_descendants()) + 1) * -2
-        self._update_edges(
-            delta,
-            self.filter(_tree_id=node._tree_id, _left__gte=node._right),
-            self.filter(_tree_id=node._tree_id, _right__gte=node._right))
-
-    def _attach_subtree(self, parent, node):
-        parent = self.get(pk=parent.pk)
-        delta = parent._depth + 1 - node._depth
-        self.filter(_tree_id=node._tree_id).update(_tree_id=parent._tree_id, _depth=models.F('_depth') + delta)
-        f = self.get(pk=node.pk)
-        f._parent = parent
-        f._depth = parent._depth + 1
-        f._tree_id = parent._tree_id
-        f.save()
-
-    def _detach_subtree(self, node):
-        return self.filter(
-            _tree_id=node._tree_id,
-            _left__gte=node._left,
-            _right__lte=node._right
-        ).update(_tree_id=uuid.uuid4())
-
-    def _update_edges(self, delta, left, right):
-        left.update(_left=models.F("_left") + delta)
-        right.update(_right=models.F("_right") + delta)
+        cache.invalidate(self.model, [node._tree_id])
+        self._summaries_changed([node._tree_id])
+        self._shift_edges(node._tree_id, [(node._right + 1, MAX_EDGE, -_width(node))])
+
+    def _open_gap(self, tree_id, position, width):
+        self._shift_edges(tree_id, [(position, MAX_EDGE, width)])
+
+    def _tree_of(self, node):
+        return self._filter_by_node(node, '1 = 1').order_by('_left')
+
+    def _subtree(self, node):
+        return self._filter_by_node(
+            node, '{table}.{left} BETWEEN ref.{left} AND ref.{right}').order_by('_left')
+
+    def _filter_by_node(self, node, condition, params=(), same_tree=True):
+        """
+        Filters against the current edges of ``node`` inside the same query, so
+        callers holding a stale instance do not need to re-fetch it first.
+        The matching rows are joined from the referenced row rather than
+        tested one by one, so the tree indexes drive the lookup. Conditions
+        that already imply the tree pass ``same_tree=False``, which leaves the
+        index choice to the condition alone.
+        """
+        names = self._sql_names()
+        condition = condition.replace('{table}', 'node')
+        if same_tree:
+            condition = 'node.{tree_id} = ref.{tree_id} AND ' + condition
+        where = (
+            '{table}.{pk} IN (SELECT node.{pk} FROM {table} ref JOIN {table} node ON ' + condition + ' '
+            'WHERE ref.{pk} = %s)'
+        ).format(**names)
+        return self.extra(where=[where], params=list(params) + [node.pk])
+
+    def _shift_edges(self, tree_id, shifts, assignments=()):
+        """
+        Adds ``delta`` to every edge value of the tree between ``low`` and
+        ``high`` for each ``(low, high, delta)`` in ``shifts``, in one UPDATE.
+        Each edge column is matched on its own values, so the result does not
+        depend on the order the database applies the assignments in.
+        """
+        assignments = list(assignments) + [_edge_case('{right}', shifts), _edge_case('{left}', shifts)]
+        self._execute_update(
+            assignments,
+            '{tree_id} = %s AND {right} >= %s AND {left} <= %s',
+            [tree_id, min(low for low, _, _ in shifts), max(high for _, high, _ in shifts)])
+
+    def _execute_update(self, assignments, where, params):
+        sql = 'UPDATE {table} SET ' + ', '.join(sql for sql, _ in assignments) + ' WHERE ' + where
+        values = [value for _, assignment_params in assignments for value in assignment_params]
+        self._connection().cursor().execute(sql.format(**self._sql_names()), values + params)
+
+    def _new_tree_id(self):
+        return self.model._meta.get_field('_tree_id').get_default()
+
+    def _write_db(self):
+        """
+        The database tree writes and their raw SQL go to: the one the manager
+        was bound to with ``db_manager``, else the router's choice for writes.
+        """
+        return self._db or router.db_for_write(self.model)
+
+    def _connection(self):
+        return connections[self._write_db()]
+
+    def _sql_names(self):
+        qn = self._connection().ops.quote_name
+        return dict(
+            table=qn(self.model._meta.db_table),
+            pk=qn(self.model._meta.pk.column),
+            parent=qn(self.model._meta.get_field('_parent').column),
+            tree_id=qn('_tree_id'),
+            left=qn('_left'),
+            right=qn('_right'),
+            depth=qn('_depth'),
+            path=qn('_path'),
+            tree_size=qn('_tree_size'),
+            tree_max_depth=qn('_tree_max_depth'),
+            tree_leaf_count=qn('_tree_leaf_count'),
+        )
 
     def contribute_to_class(self, model, name):
         super(NodeManager, self).contribute_to_class(model, name)
         if not model._meta.abstract:
-            tree_id_field = models.CharField(max_length=36, default=uuid.uuid4)
-            tree_id_field.contribute_to_class(model, "_tree_id")
+            self._add_tree_fields(model)
+        self._connect_signals(model)
 
+    def _add_tree_fields(self, model):
+        tree_id_field = TREE_ID_FIELDS[self.tree_id_type]()
+        tree_id_field.contribute_to_class(model, "_tree_id")
+        model._meta.index_together = list(model._meta.index_together) + [
+            fields for fields in TREE_INDEXES if fields not in model._meta.index_together]
+        if self.materialized_path:
+            models.TextField(default='', blank=True, db_index=True).contribute_to_class(model, '_path')
+        if self.tree_summary:
+            for name in ('_tree_size', '_tree_max_depth', '_tree_leaf_count'):
+                models.IntegerField(null=True, blank=True).contribute_to_class(model, name)
+
+    def _connect_signals(self, model):
         pre_save.connect(signals.pre_save_node, model)
         pre_delete.connect(signals.pre_delete_node, model)
+
+
+class NodeQuerySet(QuerySet):
+
+    _prefetch_tree = False
+    _measured = None
+
+    def prefetch_tree(self):
+        """
+        Runs ``NodeManager.prefetch_trees`` on the results when the queryset
+        is evaluated.
+        """
+        return self._clone(_prefetch_tree=True)
+
+    def _clone(self, klass=None, setup=False, **kwargs):
+        kwargs.setdefault('_prefetch_tree', self._prefetch_tree)
+        return super(NodeQuerySet, self)._clone(klass, setup, **kwargs)
+
+    def _fetch_all(self):
+        if self._result_cache is None and self._measured:
+            return self._fetch_measured()
+        prefetch = self._result_cache is None and self._prefetch_tree
+        super(NodeQuerySet, self)._fetch_all()
+        if prefetch:
+            self.model.objects.prefetch_trees(self._result_cache)
+
+    def _fetch_measured(self):
+        """
+        Reports the instrumented lookup that returned this queryset, with
+        the queries of the call and of the evaluation, once it is evaluated.
+        """
+        (operation, call), self._measured = self._measured, None
+        with instrumentation.Measurement() as evaluation:
+            self._fetch_all()
+        instrumentation.report(self.model, operation, call, evaluation)
+
+
+_delayed_updates = threading.local()
+
+
+class DelayedUpdates(object):
+    """
+    The trees touched inside ``delay_tree_updates`` and the counter handing
+    out pending edges.
+    """
+
+    def __init__(self):
+        self.tree_ids = set()
+        self.edges = itertools.count(1)
+
+    def touch(self, *tree_ids):
+        self.tree_ids.update(tree_ids)
+
+
+def _new_tree_id():
+    return str(uuid.uuid4())
+
+
+def _new_int_tree_id():
+    return random.getrandbits(63)
+
+
+TREE_ID_FIELDS = {
+    'uuid': lambda: models.CharField(max_length=36, default=_new_tree_id),
+    'int': lambda: models.BigIntegerField(default=_new_int_tree_id),
+}
+
+
+def _renumbered_tree_ids(tree_ids):
+    """
+    Pairs each tree id that is not yet one of the numbers ``1`` to
+    ``len(tree_ids)`` with one of those numbers no tree holds.
+    """
+    numbers = [str(number) for number in range(1, len(tree_ids) + 1)]
+    held = set(str(tree_id) for tree_id in tree_ids)
+    free = [number for number in numbers if number not in held]
+    return zip([tree_id for tree_id in tree_ids if str(tree_id) not in numbers], free)
+
+
+def _child_path(parent):
+    return parent._path + str(parent.pk) + '/' if parent else ''
+
+
+def _is_within(node, ancestor):
+    return node._tree_id == ancestor._tree_id and ancestor._left <= node._left <= ancestor._right
+
+
+def _edge_case(column, shifts):
+    whens = ' '.join('WHEN {0} BETWEEN %s AND %s THEN {0} + %s'.format(column) for _ in shifts)
+    return '{0} = CASE {1} ELSE {0} END'.format(column, whens), [value for shift in shifts for value in shift]
+
+
+def _value_case(column, values):
+    whens = ' '.join(['WHEN %s THEN %s'] * len(values))
+    return '{0} = CASE {{pk}} {1} END'.format(column, whens), [value for pair in values for value in pair]
+
+
+def _exported_fields(model):
+    return [field for field in model._meta.local_fields if not field.primary_key and field.name not in TREE_FIELDS]
+
+
+def _enclosing(above, tree_id, left):
+    """
+    Pops the nodes that end before ``left`` off ``above`` and returns the
+    innermost one still open, if any.
+    """
+    while above and (above[-1].tree_id != tree_id or above[-1].right < left):
+        above.pop()
+    return above[-1] if above else None
+
+
+def _close_nodes(path, depth, edges):
+    """
+    Pops the nodes at ``depth`` or deeper off ``path``, giving them their
+    right edges, and returns them.
+    """
+    closed = []
+    while len(path) > depth:
+        node = path.pop()
+        node._right = next(edges)
+        closed.append(node)
+    return closed
+
+
+def _batches(items, size):
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def _depth_bounds(min_depth, max_depth):
+    """
+    The given depth limits, relative to a node, as ``(lookup, offset)``
+    pairs.
+    """
+    return [(lookup, offset) for lookup, offset in (('gte', min_depth), ('lte', max_depth)) if offset is not None]
+
+
+def _within_depths(nodes, depth, bounds):
+    return [
+        node for node in nodes
+        if all(DEPTH_OPERATORS[lookup][0](node._depth, depth + offset) for lookup, offset in bounds)]
+
+
+def _tree_info(pending, next_depth):
+    node, last, opened, base = pending
+    return node, TreeInfo(
+        level=node._depth - base,
+        is_leaf=next_depth <= node._depth,
+        is_last_sibling=last,
+        open_levels=opened,
+        close_levels=max(0, node._depth - next_depth))
+
+
+def _pks_sql(nodes):
+    if hasattr(nodes, 'query'):
+        try:
+            return nodes.values('pk').query.sql_with_params()
+        except EmptyResultSet:
+            return '', []
+    pks = [node.pk for node in nodes]
+    return ', '.join(['%s'] * len(pks)), pks
+
+
+def _descendant_count(left, right):
+    return (right - left - 1) // 2
+
+
+def _width(node):
+    return node._right - node._left + 1
+
+
+def _is_pairs(nodes):
+    return any(not isinstance(ref, (list, tuple)) for _, ref in nodes)
+
+
+def _nest_pairs(pairs):
+    children = dict((id(obj), []) for obj, _ in pairs)
+    roots = []
+    for obj, parent in pairs:
+        siblings = roots if parent is None else children[id(parent)]
+        siblings.append((obj, children[id(obj)]))
+    return roots
+
+
+def _number_nodes(nodes, left, depth, tree_id):
+    """
+    Assigns edges, depth and tree id to nested ``(obj, children)`` items in
+    document order and returns the objects in that order.
+    """
+    ordered = []
+    stack = [(None, iter(nodes))]
+    while stack:
+        obj, children = stack[-1]
+        item = next(children, None)
+        if item is not None:
+            child, grandchildren = item
+            child._left, child._depth, child._tree_id = left, depth + len(stack) - 1, tree_id
+            ordered.append(child)
+            stack.append((child, iter(grandchildren)))
+        else:
+            stack.pop()
+            if obj is not None:
+                obj._right = left
+        left += 1
+    return ordered
@@ -0,0 +1,15 @@
+from django_trees.cache import TreeCache
+
+
+class TreeCacheMiddleware(object):
+    """
+    Answers tree lookups made while handling a request from a ``TreeCache``.
+    """
+
+    def process_request(self, request):
+        request.tree_cache = TreeCache().__enter__()
+
+    def process_response(self, request, response):
+        if hasattr(request, 'tree_cache'):
+            request.tree_cache.__exit__(None, None, None)
+        return response
@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, router, transaction
 from django_trees.managers import NodeManager
 from django_trees.exceptions import UnsupportedAction
+from django_trees.instrumentation import instrumented
 
 
 class AbstractNode(models.Model):
@@ -14,39 +15,113 @@ class AbstractNode(models.Model):
     class Meta(object):
         abstract = True
 
+    def _tree_manager(self):
+        """
+        The default manager bound to the database this node was read from or
+        saved to, so its tree operations run there too.
+        """
+        return type(self).objects.db_manager(self._state.db)
+
+    @instrumented('get_ascii_tree')
     def get_ascii_tree(self):
-        return '\n'.join(self._tree_lines())
-
-    def _tree_lines(self):
-        yield str(self)
-        children = list(self.get_children())
-        last = children[-1] if children else None
-        for child in children:
-            prefix = ' +-- '
-            for line in child._tree_lines():
-                yield prefix + line
-                prefix = '     ' if child is last else ' |   '
+        return '\n'.join(self.iter_ascii_tree())
+
+    def iter_ascii_tree(self):
+        pipes = []
+        for node, info in self._tree_manager().iter_tree(self):
+            if info.level:
+                pipes = pipes[:info.level - 1]
+                yield ''.join(pipes) + ' +-- ' + str(node)
+                pipes.append('     ' if info.is_last_sibling else ' |   ')
+            else:
+                yield str(node)
+
+    def save(self, *args, **kwargs):
+        """
+        Saves inside a transaction so the tree lock taken while placing a new
+        node is held until its row is inserted.
+        """
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super(AbstractNode, self).save(*args, **kwargs)
 
+    @instrumented('delete')
+    def delete(self, using=None):
+        manager = self._tree_manager()
+        if using is None and manager._can_delete_subtree():
+            manager.delete_subtree(self)
+        else:
+            super(AbstractNode, self).delete(using=using)
+
+    @instrumented('move')
     def move(self, new_parent):
-        type(self).objects._move_node(self, new_parent)
+        self._tree_manager()._move_node(self, new_parent)
+
+    @instrumented('move_to')
+    def move_to(self, target, position='first-child'):
+        """
+        Moves the node and its descendants to ``position`` relative to
+        ``target``: ``'first-child'``, ``'last-child'``, ``'before'`` or
+        ``'after'``.
+        """
+        self._tree_manager()._move_node(self, target, position)
+
+    def insert_before(self, sibling):
+        self._insert_at(sibling, 'before')
+
+    def insert_after(self, sibling):
+        self._insert_at(sibling, 'after')
+
+    def _insert_at(self, target, position):
+        if self.pk:
+            raise UnsupportedAction("You must use `move_to` to reposition an existing node.")
+        self._insert_position = (target, position)
+        self.save()
 
+    @instrumented('bifurcate')
     def bifurcate(self):
-        type(self).objects._bifurcate(self)
+        self._tree_manager()._bifurcate(self)
+
+    @instrumented('copy_to')
+    def copy_to(self, new_parent):
+        """
+        Copies the node and its descendants to the last child position of
+        ``new_parent`` and returns the copy of the node.
+        """
+        return self._tree_manager()._copy_subtree(self, new_parent)
+
+    @instrumented('copy_as_new_tree')
+    def copy_as_new_tree(self):
+        return self._tree_manager()._copy_subtree(self, None)
 
     def get_children(self):
-        return type(self).objects.filter(_parent=self)
-
-    def get_ancestors(self):
-        current_node = type(self).objects.get(pk=self.pk)
-        return type(self).objects.filter(
-            _left__lt=current_node._left, _right__gt=current_node._right,
-            _tree_id=current_node._tree_id).order_by('_right')
-
-    def get_descendants(self):
-        current_node = type(self).objects.get(pk=self.pk)
-        return type(self).objects.filter(
-            _left__gt=current_node._left, _right__lt=current_node._right,
-            _tree_id=current_node._tree_id).order_by('_left')
+        return self._tree_manager()._children(self)
+
+    def get_siblings(self):
+        return self._tree_manager()._siblings(self)
+
+    def get_next_sibling(self):
+        return self._tree_manager()._adjacent_sibling(self, 1)
+
+    def get_previous_sibling(self):
+        return self._tree_manager()._adjacent_sibling(self, -1)
+
+    @instrumented('get_ancestors')
+    def get_ancestors(self, refresh=False):
+        return self._tree_manager()._ancestors(self, refresh)
+
+    @instrumented('get_descendants')
+    def get_descendants(self, refresh=False, min_depth=None, max_depth=None):
+        """
+        Returns the descendants of the node, limited to those ``min_depth``
+        to ``max_depth`` levels below it when given, e.g. ``max_depth=1`` for
+        the children alone.
+        """
+        return self._tree_manager()._descendants(self, refresh, min_depth, max_depth)
+
+    @property
+    def descendant_count(self):
+        return self._tree_manager().descendant_count(self)
 
     @property
     def parent(self):
@@ -1,17 +1,33 @@
+from django_trees import cache
+from django_trees.instrumentation import instrumented
 
 
+@instrumented('pre_delete_node')
 def pre_delete_node(sender, *args, **kwargs):
-    instance = sender.objects.get(pk=kwargs.get('instance').pk)
+    instance = kwargs.get('instance')
+    manager = sender.objects.db_manager(kwargs.get('using'))
+    delayed = manager._delayed()
+    if delayed:
+        delayed.touch(instance._tree_id)
+        cache.invalidate(sender, [instance._tree_id])
+        return
+    if manager.get(pk=instance.pk)._deleting:
+        return
+    instance = manager._lock_trees_of(instance)[instance.pk]
     if not instance._deleting:
-        instance.get_descendants().update(_deleting=True)
-        sender.objects._renumber_source_tree_for_subtree_deletion(instance)
+        manager.filter(
+            _tree_id=instance._tree_id, _left__gt=instance._left, _left__lt=instance._right
+        ).update(_deleting=True)
+        manager._renumber_source_tree_for_subtree_deletion(instance)
 
 
+@instrumented('pre_save_node')
 def pre_save_node(sender, *args, **kwargs):
     instance = kwargs.get('instance')
-    if not instance.pk and instance.parent:
-        parent = sender.objects.get(pk=instance.parent.pk)
-        instance._depth = parent._depth + 1
-        instance._left = parent._right
-        instance._right = instance._left + 1
-        sender.objects._renumber_source_tree_for_node_insertion(instance)
+    if not instance.pk:
+        sender.objects.db_manager(kwargs.get('using'))._insert_node(instance)
+
+
+def post_save_node(sender, *args, **kwargs):
+    if kwargs.get('created'):
+        sender.objects.db_manager(kwargs.get('using'))._link_node(kwargs.get('instance'))
@@ -87,5 +87,37 @@ class GetASCIITreeTests(test.TestCase):
               +-- G
         """, a)
 
+    def test_iter_ascii_tree_yields_one_line_per_node(self):
+        a = Node.objects.create(name='A')
+        b = Node.objects.create(name='B', parent=a)
+        Node.objects.create(name='C', parent=b)
+        self.assertEqual(['B', ' +-- C'], list(b.iter_ascii_tree()))
+
+    def test_renders_from_stale_instance(self):
+        a = Node.objects.create(name='A')
+        Node.objects.create(name='B', parent=a)
+        self.assertEqual(2, a._right)
+        self.assertTree("""
+        A
+         +-- B
+        """, a)
+
+    def test_deep_tree_is_rendered_with_a_single_query(self):
+        root = node = Node.objects.create(name='0')
+        for i in range(1, 30):
+            node = Node.objects.create(name=str(i), parent=node)
+        with self.assertNumQueries(1):
+            lines = root.get_ascii_tree().splitlines()
+        self.assertEqual(30, len(lines))
+        self.assertEqual('     ' * 28 + ' +-- 29', lines[-1])
+
+    def test_wide_tree_is_rendered_with_a_single_query(self):
+        root = Node.objects.create(name='root')
+        for i in range(50):
+            Node.objects.create(name=str(i), parent=root)
+        with self.assertNumQueries(1):
+            lines = root.get_ascii_tree().splitlines()
+        self.assertEqual(['root'] + [' +-- {}'.format(i) for i in range(50)], lines)
+
     def assertTree(self, tree, node):
         self.assertEqual(dedent(tree).strip(), node.get_ascii_tree())
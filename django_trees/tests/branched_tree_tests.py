@@ -503,3 +503,24 @@ class ComplexTests(TestCase, NodeTestHelper):
         self.assertTrue(4 == self.nJ._depth == self.nK._depth == self.nL._depth)
         self.assertTrue(5 == self.nM._depth == self.nN._depth == self.nO._depth)
         self.assertEqual(None, self.nB.parent)
+
+    def test_move_within_tree_uses_same_number_of_queries_regardless_of_subtree_size(self):
+        with self.assertNumQueries(5):
+            self.nE.move(self.nG)
+        with self.assertNumQueries(5):
+            self.nF.move(self.nB)
+        self.assertEqual(list(self.nG.get_children()), [self.nE])
+        self.assertEqual(list(self.nB.get_children().order_by('_left')), [self.nF, self.nD])
+        self.assertEqual(list(self.nN.get_ancestors()), [self.nK, self.nH, self.nF, self.nB, self.nA])
+
+    def test_move_to_another_tree_uses_constant_number_of_queries(self):
+        self.nV = self.create_node('V')
+        with self.assertNumQueries(8):
+            self.nC.move(self.nV)
+        self.assertEqual(12, Node.objects.filter(_tree_id=self.nV._tree_id).count())
+        self.assertEqual(list(self.nN.get_ancestors()), [self.nK, self.nH, self.nF, self.nC, self.nV])
+
+    def test_bifurcate_uses_constant_number_of_queries(self):
+        with self.assertNumQueries(6):
+            self.nF.bifurcate()
+        self.assertEqual(list(self.nN.get_ancestors()), [self.nK, self.nH, self.nF])
@@ -0,0 +1,87 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django_trees.tests.test_app.models import Node, PathNode
+from django_trees.tests.helper import NodeTestHelper
+
+
+class BulkCreateTreeTests(TestCase, NodeTestHelper):
+
+    def test_creates_new_tree_from_nested_structure(self):
+        a, b, c, d = [Node(name=name) for name in 'ABCD']
+        Node.objects.bulk_create_tree([(a, [(b, []), (c, [(d, [])])])])
+        self.refresh_node_instances()
+        self.assertEqual((1, 8), self.nA.edges)
+        self.assertEqual((2, 3), self.nB.edges)
+        self.assertEqual((4, 7), self.nC.edges)
+        self.assertEqual((5, 6), self.nD.edges)
+        self.assertEqual([0, 1, 1, 2], [self.nA._depth, self.nB._depth, self.nC._depth, self.nD._depth])
+        self.assertEqual(None, self.nA.parent)
+        self.assertEqual(self.nA, self.nB.parent)
+        self.assertEqual(self.nC, self.nD.parent)
+        self.assertEqual(1, len(set(n._tree_id for n in Node.objects.all())))
+
+    def test_creates_tree_from_parent_pairs(self):
+        a, b, c, d = [Node(name=name) for name in 'ABCD']
+        Node.objects.bulk_create_tree([(d, c), (a, None), (c, a), (b, a)])
+        self.refresh_node_instances()
+        self.assertEqual(list(self.nA.get_descendants()), [self.nC, self.nD, self.nB])
+        self.assertEqual((1, 8), self.nA.edges)
+        self.assertEqual((2, 5), self.nC.edges)
+        self.assertEqual((3, 4), self.nD.edges)
+        self.assertEqual((6, 7), self.nB.edges)
+
+    def test_each_top_level_node_starts_its_own_tree(self):
+        a, b, c = [Node(name=name) for name in 'ABC']
+        Node.objects.bulk_create_tree([(a, [(b, [])]), (c, [])])
+        self.refresh_node_instances()
+        self.assertEqual((1, 4), self.nA.edges)
+        self.assertEqual((1, 2), self.nC.edges)
+        self.assertNotEqual(self.nA._tree_id, self.nC._tree_id)
+        self.assertEqual(list(self.nA.get_descendants()), [self.nB])
+
+    def test_grafts_under_existing_node(self):
+        self.nA = self.create_node('A')
+        self.nB = self.create_node('B', self.nA)
+        self.nC = self.create_node('C', self.nA)
+        x, y = Node(name='X'), Node(name='Y')
+        Node.objects.bulk_create_tree([(x, [(y, [])])], parent=self.nB)
+        self.refresh_node_instances()
+        self.assertEqual((1, 10), self.nA.edges)
+        self.assertEqual((2, 7), self.nB.edges)
+        self.assertEqual((3, 6), self.nX.edges)
+        self.assertEqual((4, 5), self.nY.edges)
+        self.assertEqual((8, 9), self.nC.edges)
+        self.assertEqual(self.nB, self.nX.parent)
+        self.assertEqual(self.nX, self.nY.parent)
+        self.assertEqual([2, 3], [self.nX._depth, self.nY._depth])
+        self.assertEqual(list(self.nY.get_ancestors()), [self.nX, self.nB, self.nA])
+
+    def test_graft_writes_links_in_batches(self):
+        root = self.create_node('root')
+        nodes = [(Node(name=str(i)), [(Node(name='{}.{}'.format(i, j)), []) for j in range(5)]) for i in range(20)]
+        # the inserted rows are read back once and their 120 links written 100 at a time
+        with self.assertNumQueries(9):
+            Node.objects.bulk_create_tree(nodes, parent=root)
+        self.assertEqual(121, Node.objects.filter(_tree_id=root._tree_id).count())
+        self.assertEqual((1, 242), Node.objects.get(pk=root.pk).edges)
+
+    def test_links_are_written_without_reading_the_updated_table(self):
+        root = PathNode.objects.create(name='root')
+        with CaptureQueriesContext(connection) as queries:
+            PathNode.objects.bulk_create_tree([(PathNode(name='X'), [(PathNode(name='Y'), [])])], parent=root)
+            PathNode.objects.bulk_create_tree([(PathNode(name='Z'), [(PathNode(name='W'), [])])])
+        updates = [query['sql'] for query in queries if 'UPDATE "' in query['sql']]
+        self.assertTrue(updates)
+        self.assertFalse([sql for sql in updates if 'SELECT' in sql])
+        self.assertEqual(['root', 'X'], [node.name for node in PathNode.objects.get(name='Y').get_ancestors()[::-1]])
+        self.assertEqual(['Z'], [node.name for node in PathNode.objects.get(name='W').get_ancestors()])
+
+    def test_nodes_created_after_bulk_insert_are_numbered_correctly(self):
+        a, b = Node(name='A'), Node(name='B')
+        Node.objects.bulk_create_tree([(a, [(b, [])])])
+        self.nA = Node.objects.get(name='A')
+        self.create_node('C', self.nA)
+        self.assertEqual((1, 6), self.nA.edges)
+        self.assertEqual((2, 3), self.nB.edges)
+        self.assertEqual((4, 5), self.nC.edges)
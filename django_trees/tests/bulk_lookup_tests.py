@@ -0,0 +1,47 @@
+from django.test import TestCase
+from django_trees.tests.test_app.models import Node
+from django_trees.tests.helper import NodeTestHelper
+
+
+class BulkLookupTests(TestCase, NodeTestHelper):
+
+    def setUp(self):
+        self.nA = self.create_node('A')
+        self.nB = self.create_node('B', self.nA)
+        self.nC = self.create_node('C', self.nA)
+        self.nD = self.create_node('D', self.nC)
+        self.nE = self.create_node('E', self.nD)
+        self.nV = self.create_node('V')
+        self.nW = self.create_node('W', self.nV)
+
+    def test_ancestors_of_queryset_in_one_query(self):
+        with self.assertNumQueries(1):
+            ancestors = Node.objects.ancestors_of(Node.objects.filter(name__in=['A', 'B', 'E', 'W']))
+        self.assertEqual(ancestors[self.nA.pk], [])
+        self.assertEqual(ancestors[self.nB.pk], [self.nA])
+        self.assertEqual(ancestors[self.nE.pk], [self.nD, self.nC, self.nA])
+        self.assertEqual(ancestors[self.nW.pk], [self.nV])
+
+    def test_descendants_of_list_in_one_query(self):
+        with self.assertNumQueries(1):
+            descendants = Node.objects.descendants_of([self.nA, self.nD, self.nV, self.nW])
+        self.assertEqual(descendants[self.nA.pk], [self.nB, self.nC, self.nD, self.nE])
+        self.assertEqual(descendants[self.nD.pk], [self.nE])
+        self.assertEqual(descendants[self.nV.pk], [self.nW])
+        self.assertEqual(descendants[self.nW.pk], [])
+
+    def test_children_of_in_one_query(self):
+        with self.assertNumQueries(1):
+            children = Node.objects.children_of(Node.objects.filter(_depth=0))
+        self.assertEqual(children[self.nA.pk], [self.nB, self.nC])
+        self.assertEqual(children[self.nV.pk], [self.nW])
+        self.assertEqual(children[self.nE.pk], [])
+
+    def test_empty_list_issues_no_query(self):
+        with self.assertNumQueries(0):
+            self.assertEqual({}, Node.objects.ancestors_of([]))
+
+    def test_empty_queryset_issues_no_query(self):
+        with self.assertNumQueries(0):
+            self.assertEqual({}, Node.objects.ancestors_of(Node.objects.none()))
+            self.assertEqual({}, Node.objects.descendants_of(Node.objects.filter(pk__in=[])))
@@ -0,0 +1,116 @@
+from django.db.models.signals import post_delete
+from django.test import TestCase
+from django_trees.exceptions import InvalidNodeMove, UnsupportedAction
+from django_trees.tests.test_app.models import ClosureNode
+
+ClosureNodeLink = ClosureNode.objects.link_model
+
+
+class ClosureTreeTests(TestCase):
+
+    def setUp(self):
+        self.a = ClosureNode.objects.create(name='A')
+        self.b = ClosureNode.objects.create(name='B', parent=self.a)
+        self.c = ClosureNode.objects.create(name='C', parent=self.b)
+        self.d = ClosureNode.objects.create(name='D', parent=self.a)
+        self.v = ClosureNode.objects.create(name='V')
+
+    def links(self):
+        return set(ClosureNodeLink.objects.values_list('ancestor__name', 'descendant__name', 'distance'))
+
+    def names(self, nodes):
+        return [node.name for node in nodes]
+
+    def test_link_model_is_created_for_concrete_model(self):
+        self.assertEqual('ClosureNodeLink', ClosureNodeLink.__name__)
+        self.assertEqual('test_app_closurenode_link', ClosureNodeLink._meta.db_table)
+
+    def test_insert_links_node_to_every_ancestor(self):
+        self.assertEqual({
+            ('A', 'A', 0), ('B', 'B', 0), ('C', 'C', 0), ('D', 'D', 0), ('V', 'V', 0),
+            ('A', 'B', 1), ('A', 'C', 2), ('B', 'C', 1), ('A', 'D', 1),
+        }, self.links())
+
+    def test_insert_does_not_touch_edges(self):
+        self.assertEqual({(1, 2)}, set(ClosureNode.objects.values_list('_left', '_right')))
+        self.assertEqual([0, 1, 2], [ClosureNode.objects.get(pk=n.pk)._depth for n in (self.a, self.b, self.c)])
+
+    def test_lookups(self):
+        self.assertEqual(['B', 'A'], self.names(self.c.get_ancestors()))
+        self.assertEqual(['B', 'D', 'C'], self.names(self.a.get_descendants()))
+        self.assertEqual(['B', 'D'], self.names(self.a.get_children()))
+        self.assertEqual(['D'], self.names(self.b.get_siblings()))
+        self.assertEqual([], self.names(self.a.get_siblings()))
+        self.assertEqual(3, self.a.descendant_count)
+
+    def test_lookups_for_many_nodes(self):
+        with self.assertNumQueries(1):
+            ancestors = ClosureNode.objects.ancestors_of([self.a, self.c])
+        self.assertEqual({self.c.pk: [self.b, self.a]}, dict(ancestors))
+        with self.assertNumQueries(1):
+            descendants = ClosureNode.objects.descendants_of(ClosureNode.objects.filter(name__in=['A', 'V']))
+        self.assertEqual({self.a.pk: [self.b, self.d, self.c]}, dict(descendants))
+
+    def test_move_within_tree(self):
+        self.b.move(self.d)
+        self.assertEqual(['B', 'D', 'A'], self.names(self.c.get_ancestors()))
+        self.assertEqual(['B', 'C'], self.names(self.d.get_descendants()))
+        self.assertEqual([3, 2], [ClosureNode.objects.get(pk=n.pk)._depth for n in (self.c, self.b)])
+        self.assertEqual(self.d.pk, ClosureNode.objects.get(pk=self.b.pk)._parent_id)
+
+    def test_move_only_touches_links_of_moved_subtree(self):
+        untouched = set(ClosureNodeLink.objects.exclude(descendant__in=[self.b, self.c]).values_list('pk', flat=True))
+        self.b.move(self.v)
+        self.assertTrue(untouched <= set(ClosureNodeLink.objects.values_list('pk', flat=True)))
+        self.assertEqual({
+            ('A', 'A', 0), ('B', 'B', 0), ('C', 'C', 0), ('D', 'D', 0), ('V', 'V', 0),
+            ('V', 'B', 1), ('V', 'C', 2), ('B', 'C', 1), ('A', 'D', 1),
+        }, self.links())
+
+    def test_move_to_other_tree_takes_its_tree_id(self):
+        self.b.move(self.v)
+        self.assertEqual({self.v._tree_id}, set(
+            ClosureNode.objects.filter(name__in='BCV').values_list('_tree_id', flat=True)))
+
+    def test_bifurcate(self):
+        self.b.bifurcate()
+        b, c = ClosureNode.objects.get(pk=self.b.pk), ClosureNode.objects.get(pk=self.c.pk)
+        self.assertEqual((None, 0, 1), (b._parent_id, b._depth, c._depth))
+        self.assertEqual(b._tree_id, c._tree_id)
+        self.assertNotEqual(self.a._tree_id, b._tree_id)
+        self.assertEqual([], self.names(b.get_ancestors()))
+        self.assertEqual(['D'], self.names(self.a.get_descendants()))
+
+    def test_cannot_move_node_below_itself(self):
+        with self.assertRaises(InvalidNodeMove):
+            self.a.move(self.c)
+        with self.assertRaises(InvalidNodeMove):
+            self.a.move(self.a)
+
+    def test_delete_removes_subtree_and_links(self):
+        b = ClosureNode.objects.get(pk=self.b.pk)
+        with self.assertNumQueries(6):
+            b.delete()
+        self.assertIsNone(b.pk)
+        self.assertEqual(['A', 'D', 'V'], self.names(ClosureNode.objects.order_by('name')))
+        self.assertEqual({('A', 'A', 0), ('D', 'D', 0), ('V', 'V', 0), ('A', 'D', 1)}, self.links())
+
+    def test_delete_falls_back_to_collector_when_receivers_are_registered(self):
+        deleted = []
+
+        def receiver(sender, instance, **kwargs):
+            deleted.append(instance.name)
+
+        post_delete.connect(receiver, sender=ClosureNode)
+        try:
+            ClosureNode.objects.get(pk=self.b.pk).delete()
+        finally:
+            post_delete.disconnect(receiver, sender=ClosureNode)
+        self.assertEqual(['B', 'C'], sorted(deleted))
+        self.assertEqual({('A', 'A', 0), ('D', 'D', 0), ('V', 'V', 0), ('A', 'D', 1)}, self.links())
+
+    def test_edge_based_features_are_unsupported(self):
+        with self.assertRaises(UnsupportedAction):
+            ClosureNode.objects.bulk_create_tree([(ClosureNode(name='X'), [])])
+        with self.assertRaises(UnsupportedAction):
+            self.a.get_ascii_tree()
@@ -0,0 +1,75 @@
+from django.test import TestCase
+from django_trees.exceptions import UnsupportedAction
+from django_trees.tests.test_app.models import Node, PathNode, SummaryNode, ClosureNode
+
+
+class CopyTests(TestCase):
+
+    def build(self, model):
+        a = model.objects.create(name='A')
+        b = model.objects.create(name='B', parent=a)
+        model.objects.create(name='C', parent=b)
+        model.objects.create(name='E', parent=b)
+        d = model.objects.create(name='D', parent=a)
+        return a, b, d
+
+    def shape(self, model, root):
+        root = model.objects.get(pk=root.pk)
+        return [
+            (node.name, node._left - root._left, node._right - root._left, node._depth - root._depth)
+            for node in model.objects.filter(
+                _tree_id=root._tree_id, _left__gte=root._left, _left__lte=root._right).order_by('_left')]
+
+    def test_copy_to_grafts_copy_as_last_child(self):
+        a, b, d = self.build(Node)
+        before = self.shape(Node, b)
+        copy = b.copy_to(d)
+        self.assertNotEqual(b.pk, copy.pk)
+        self.assertEqual('D', copy.parent.name)
+        self.assertEqual(before, self.shape(Node, b))
+        self.assertEqual(before, self.shape(Node, copy))
+        self.assertEqual(['B', 'C', 'E', 'D', 'B', 'C', 'E'], [node.name for node in a.get_descendants(refresh=True)])
+        self.assertEqual(['B', 'D', 'A'], [node.name for node in copy.get_descendants()[0].get_ancestors()])
+        self.assertEqual([], Node.objects.check_tree(a._tree_id))
+
+    def test_copy_shifts_target_tree_once(self):
+        a, b, d = self.build(Node)
+        target = Node.objects.create(name='X')
+        # savepoint, both trees locked and re-read, the source rows, then bulk_create_tree re-locking the target
+        # inside its own savepoint, one edge shift, one insert, reading back and linking, the release and the copy
+        with self.assertNumQueries(15):
+            b.copy_to(target)
+        self.assertEqual([], Node.objects.check_tree(target._tree_id))
+
+    def test_copy_into_own_subtree(self):
+        a, b, d = self.build(Node)
+        c = Node.objects.get(name='C')
+        b.copy_to(c)
+        self.assertEqual(['C', 'B', 'C', 'E', 'E'], [node.name for node in b.get_descendants(refresh=True)])
+        self.assertEqual([], Node.objects.check_tree(a._tree_id))
+
+    def test_copy_as_new_tree(self):
+        a, b, d = self.build(Node)
+        copy = b.copy_as_new_tree()
+        self.assertNotEqual(a._tree_id, copy._tree_id)
+        self.assertIsNone(copy.parent)
+        self.assertEqual(self.shape(Node, b), self.shape(Node, copy))
+        self.assertEqual([], Node.objects.check_tree(copy._tree_id))
+
+    def test_copy_links_paths_and_recounts_summaries(self):
+        a, b, d = self.build(PathNode)
+        copy = b.copy_to(d)
+        self.assertEqual(['B', 'D', 'A'], [node.name for node in copy.get_descendants()[0].get_ancestors()])
+        a, b, d = self.build(SummaryNode)
+        b.copy_to(d)
+        b.copy_as_new_tree()
+        self.assertEqual(SummaryNode.objects._count_trees(), SummaryNode.objects.tree_stats())
+
+    def test_copies_cannot_be_delayed_or_made_of_closure_trees(self):
+        a, b, d = self.build(Node)
+        with self.assertRaises(UnsupportedAction):
+            with Node.objects.delay_tree_updates():
+                b.copy_to(d)
+        a, b, d = self.build(ClosureNode)
+        with self.assertRaises(UnsupportedAction):
+            b.copy_as_new_tree()
@@ -0,0 +1,38 @@
+from django.test import TestCase
+from django_trees.exceptions import InvalidNodeMove
+from django_trees.tests.test_app.models import Node, ClosureNode
+
+
+class DatabaseRoutingTests(TestCase):
+    multi_db = True
+
+    def build(self, model):
+        manager = model.objects.db_manager('other')
+        a = manager.create(name='A')
+        b = manager.create(name='B', parent=a)
+        manager.create(name='C', parent=b)
+        d = manager.create(name='D', parent=a)
+        return manager, a, b, d
+
+    def test_tree_updates_run_on_the_database_of_the_manager(self):
+        manager, a, b, d = self.build(Node)
+        b.move(d)
+        manager.create(name='E', parent=b)
+        self.assertEqual(['D', 'B', 'C', 'E'], [node.name for node in a.get_descendants(refresh=True)])
+        self.assertEqual(5, manager.tree_stats()[a._tree_id].node_count)
+        manager.delete_subtree(b)
+        self.assertEqual(['D'], [node.name for node in a.get_descendants(refresh=True)])
+        self.assertEqual([], manager.check_tree(a._tree_id))
+        self.assertFalse(Node.objects.exists())
+
+    def test_closure_links_are_written_to_the_database_of_the_manager(self):
+        manager, a, b, d = self.build(ClosureNode)
+        b.move(d)
+        self.assertEqual(['B', 'D', 'A'], [node.name for node in b.get_descendants()[0].get_ancestors()])
+        self.assertEqual(3, a.descendant_count)
+        with self.assertRaises(InvalidNodeMove):
+            a.move(b)
+        b.delete()
+        self.assertEqual(['D'], [node.name for node in a.get_descendants()])
+        self.assertFalse(ClosureNode.objects.exists())
+        self.assertFalse(ClosureNode.objects.link_model.objects.exists())
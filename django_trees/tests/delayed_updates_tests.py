@@ -0,0 +1,108 @@
+from django.test import TestCase
+from django_trees.exceptions import InvalidNodeMove, UnsupportedAction
+from django_trees.tests.test_app.models import Node, SparseNode, PathNode, ClosureNode
+from django_trees.tests.helper import NodeTestHelper
+
+
+class DelayedUpdatesTests(TestCase, NodeTestHelper):
+
+    def setUp(self):
+        self.create_node('A')
+        self.create_node('B', self.nA)
+        self.create_node('C', self.nB)
+        self.create_node('D', self.nA)
+        self.create_node('X')
+        self.create_node('Y', self.nX)
+        self.refresh_node_instances()
+
+    def tree(self, root):
+        return [(n.name, n._left, n._right, n._depth) for n in Node.objects.filter(
+            _tree_id=Node.objects.get(name=root)._tree_id).order_by('_left')]
+
+    def test_inserts_append_children_and_rebuild_once_on_exit(self):
+        with Node.objects.delay_tree_updates():
+            with self.assertNumQueries(3):
+                Node.objects.create(name='E', parent=self.nB)
+            self.create_node('F', self.nB)
+            self.create_node('G', Node.objects.get(name='E'))
+        self.assertEqual([
+            ('A', 1, 14, 0), ('B', 2, 11, 1), ('C', 3, 4, 2), ('E', 5, 8, 2), ('G', 6, 7, 3),
+            ('F', 9, 10, 2), ('D', 12, 13, 1)], self.tree('A'))
+        self.assertEqual([], Node.objects.check_tree(self.nA._tree_id))
+
+    def test_moves_follow_child_positions_in_call_order(self):
+        with Node.objects.delay_tree_updates():
+            self.nC.move(self.nA)
+            self.nY.move_to(self.nA, 'last-child')
+            self.nD.move(self.nA)
+        self.assertEqual([
+            ('A', 1, 10, 0), ('D', 2, 3, 1), ('C', 4, 5, 1), ('B', 6, 7, 1), ('Y', 8, 9, 1)], self.tree('A'))
+        self.assertEqual([('X', 1, 2, 0)], self.tree('X'))
+
+    def test_moved_subtree_takes_tree_of_new_root(self):
+        with Node.objects.delay_tree_updates():
+            self.nB.move(self.nX)
+            self.create_node('E', self.nC)
+        self.assertEqual([
+            ('X', 1, 10, 0), ('B', 2, 7, 1), ('C', 3, 6, 2), ('E', 4, 5, 3), ('Y', 8, 9, 1)], self.tree('X'))
+        self.assertEqual([('A', 1, 4, 0), ('D', 2, 3, 1)], self.tree('A'))
+
+    def test_bifurcate_starts_new_tree(self):
+        with Node.objects.delay_tree_updates():
+            self.nB.bifurcate()
+        self.assertEqual([('B', 1, 4, 0), ('C', 2, 3, 1)], self.tree('B'))
+        self.assertNotEqual(self.nA._tree_id, Node.objects.get(name='C')._tree_id)
+        self.assertEqual([('A', 1, 4, 0), ('D', 2, 3, 1)], self.tree('A'))
+
+    def test_deletes_collect_subtree_and_close_gap_on_exit(self):
+        with Node.objects.delay_tree_updates():
+            self.create_node('E', self.nC)
+            Node.objects.get(name='B').delete()
+        self.assertEqual([('A', 1, 4, 0), ('D', 2, 3, 1)], self.tree('A'))
+
+    def test_nested_blocks_rebuild_on_outer_exit(self):
+        with Node.objects.delay_tree_updates():
+            with Node.objects.delay_tree_updates():
+                self.create_node('E', self.nD)
+            self.assertEqual(Node.objects.get(name='E')._left, Node.objects.get(name='E')._right)
+        self.assertEqual([], Node.objects.check_tree(self.nA._tree_id))
+
+    def test_exception_rolls_back_block(self):
+        with self.assertRaises(InvalidNodeMove):
+            with Node.objects.delay_tree_updates():
+                self.create_node('E', self.nC)
+                self.nB.move(Node.objects.get(name='E'))
+        self.assertFalse(Node.objects.filter(name='E').exists())
+        self.assertIsNone(Node.objects._delayed())
+
+    def test_untouched_trees_are_not_rebuilt(self):
+        with Node.objects.delay_tree_updates():
+            self.create_node('Z', self.nY)
+        self.assertEqual([('X', 1, 6, 0), ('Y', 2, 5, 1), ('Z', 3, 4, 2)], self.tree('X'))
+        self.assertEqual([('A', 1, 8, 0), ('B', 2, 5, 1), ('C', 3, 4, 2), ('D', 6, 7, 1)], self.tree('A'))
+
+    def test_sibling_positions_cannot_be_delayed(self):
+        with Node.objects.delay_tree_updates():
+            with self.assertRaises(UnsupportedAction):
+                self.nC.move_to(self.nD, 'before')
+            with self.assertRaises(UnsupportedAction):
+                Node(name='E').insert_after(self.nD)
+            with self.assertRaises(UnsupportedAction):
+                Node.objects.delete_subtree(self.nB)
+
+    def test_root_insert_is_not_delayed(self):
+        with Node.objects.delay_tree_updates():
+            root = Node.objects.create(name='R')
+        self.assertEqual((1, 2), (root._left, root._right))
+
+    def test_sparse_tree_is_rebuilt_dense(self):
+        a = SparseNode.objects.create(name='A')
+        with SparseNode.objects.delay_tree_updates():
+            SparseNode.objects.create(name='B', parent=a)
+        self.assertEqual([(1, 4), (2, 3)], list(SparseNode.objects.order_by('_left').values_list('_left', '_right')))
+
+    def test_path_and_closure_trees_cannot_delay(self):
+        with self.assertRaises(UnsupportedAction):
+            PathNode.objects.delay_tree_updates().__enter__()
+        with self.assertRaises(UnsupportedAction):
+            ClosureNode.objects.delay_tree_updates()
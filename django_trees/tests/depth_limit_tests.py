@@ -0,0 +1,55 @@
+from django.test import TestCase
+from django_trees.cache import TreeCache
+from django_trees.tests.test_app.models import Node, PathNode, ClosureNode
+from django_trees.tests.helper import NodeTestHelper
+
+
+class DepthLimitTests(TestCase, NodeTestHelper):
+
+    def setUp(self):
+        self.create_node('A')
+        self.create_node('B', self.nA)
+        self.create_node('C', self.nB)
+        self.create_node('E', self.nC)
+        self.create_node('D', self.nA)
+        self.create_node('F', self.nD)
+
+    def names(self, nodes):
+        return [node.name for node in nodes]
+
+    def assertDepthWindows(self, root, descendants):
+        self.assertEqual(['B', 'D'], self.names(descendants(root, max_depth=1)))
+        self.assertEqual(['C', 'E', 'F'], sorted(self.names(descendants(root, min_depth=2))))
+        self.assertEqual(['C', 'F'], sorted(self.names(descendants(root, min_depth=2, max_depth=2))))
+        self.assertEqual(['B', 'C', 'D', 'E', 'F'], sorted(self.names(descendants(root))))
+
+    def test_limits_depth_relative_to_node_in_sql(self):
+        self.assertDepthWindows(self.nA, lambda node, **depths: node.get_descendants(**depths))
+        self.assertEqual(['C'], self.names(self.nB.get_descendants(max_depth=1)))
+
+    def test_stale_instance_uses_current_depth(self):
+        b = Node.objects.get(name='B')
+        self.nB.move(self.nD)
+        self.assertEqual(['C'], self.names(b.get_descendants(min_depth=1, max_depth=1)))
+        self.assertEqual(['C'], self.names(b.get_descendants(max_depth=1, refresh=True)))
+
+    def test_limits_depth_in_tree_cache(self):
+        with TreeCache():
+            self.nA.get_descendants()
+            with self.assertNumQueries(0):
+                self.assertDepthWindows(self.nA, lambda node, **depths: node.get_descendants(**depths))
+
+    def test_limits_depth_of_path_and_closure_trees(self):
+        for model in (PathNode, ClosureNode):
+            a = model.objects.create(name='A')
+            b = model.objects.create(name='B', parent=a)
+            model.objects.create(name='E', parent=model.objects.create(name='C', parent=b))
+            model.objects.create(name='F', parent=model.objects.create(name='D', parent=a))
+            self.assertDepthWindows(a, lambda node, **depths: node.get_descendants(**depths))
+
+    def test_level_pages_by_left_edge(self):
+        tree_id = self.nA._tree_id
+        self.assertEqual(['B', 'D'], self.names(Node.objects.level(tree_id, 1)))
+        self.assertEqual(['C'], self.names(Node.objects.level(tree_id, 2)[:1]))
+        self.assertEqual(['F'], self.names(Node.objects.level(tree_id, 2, after=self.nC)[:1]))
+        self.assertEqual([], self.names(Node.objects.level(tree_id, 2, after=self.nF)))
@@ -0,0 +1,68 @@
+from StringIO import StringIO
+from django.test import TestCase
+from django_trees.exceptions import UnsupportedAction
+from django_trees.tests.test_app.models import Node, PathNode, ClosureNode
+
+
+class ExportImportTests(TestCase):
+
+    def build(self, model):
+        a = model.objects.create(name='A')
+        b = model.objects.create(name='B', parent=a)
+        model.objects.create(name='C', parent=b)
+        model.objects.create(name='D', parent=a)
+        return a
+
+    def export(self, model, root):
+        stream = StringIO()
+        model.objects.export_tree(root._tree_id, stream)
+        stream.seek(0)
+        return stream
+
+    def shape(self, model, root):
+        return [
+            (node.name, node._left, node._right, node._depth, node.parent and node.parent.name)
+            for node in model.objects.filter(_tree_id=root._tree_id).order_by('_left')]
+
+    def test_exports_one_compact_line_per_node_in_edge_order(self):
+        a = self.build(Node)
+        stream = StringIO()
+        with self.assertNumQueries(1):
+            self.assertEqual(4, Node.objects.export_tree(a._tree_id, stream))
+        self.assertEqual(
+            '{"fields": ["name"], "model": "Node"}\n[0,"A"]\n[1,"B"]\n[2,"C"]\n[1,"D"]\n', stream.getvalue())
+
+    def test_import_creates_copy_as_new_tree(self):
+        a = self.build(Node)
+        root = Node.objects.import_tree(self.export(Node, a))
+        self.assertNotEqual(a._tree_id, root._tree_id)
+        self.assertEqual(self.shape(Node, a), self.shape(Node, root))
+        self.assertEqual([], Node.objects.check_tree(root._tree_id))
+
+    def test_import_writes_in_batches(self):
+        a = self.build(Node)
+        stream = self.export(Node, a)
+        # savepoint, a batch when D closes B and C, the last batch, reading back and linking, root and release
+        with self.assertNumQueries(7):
+            root = Node.objects.import_tree(stream, batch_size=1)
+        self.assertEqual(self.shape(Node, a), self.shape(Node, root))
+
+    def test_import_links_materialized_paths(self):
+        a = self.build(PathNode)
+        root = PathNode.objects.import_tree(self.export(PathNode, a))
+        c = PathNode.objects.get(_tree_id=root._tree_id, name='C')
+        self.assertEqual(['B', 'A'], [node.name for node in c.get_ancestors()])
+        self.assertEqual(['B', 'C', 'D'], [node.name for node in root.get_descendants()])
+
+    def test_rejects_streams_that_are_not_one_tree(self):
+        header = '{"model": "Node", "fields": ["name"]}\n'
+        for lines in (['[0,"A"]', '[2,"B"]'], ['[0,"A"]', '[0,"B"]'], ['[1,"A"]'], []):
+            with self.assertRaises(ValueError):
+                Node.objects.import_tree(StringIO(header + ''.join(line + '\n' for line in lines)))
+        self.assertFalse(Node.objects.exists())
+
+    def test_closure_trees_cannot_be_exported_or_imported(self):
+        with self.assertRaises(UnsupportedAction):
+            ClosureNode.objects.export_tree('tree', StringIO())
+        with self.assertRaises(UnsupportedAction):
+            ClosureNode.objects.import_tree(StringIO())
@@ -0,0 +1,77 @@
+from django.db import connection
+from django.test import TestCase
+from django_trees import instrumentation
+from django_trees.tests.test_app.models import Node
+from django_trees.tests.helper import NodeTestHelper
+
+
+class InstrumentationTests(TestCase, NodeTestHelper):
+
+    def setUp(self):
+        self.create_node('A')
+        self.create_node('B', self.nA)
+        self.create_node('C', self.nB)
+        self.create_node('D', self.nA)
+        self.reports = []
+        instrumentation.tree_operation.connect(self.report)
+        instrumentation.stats.reset()
+        instrumentation.enable()
+
+    def tearDown(self):
+        instrumentation.disable()
+        instrumentation.tree_operation.disconnect(self.report)
+
+    def report(self, sender, **kwargs):
+        self.reports.append((sender, kwargs['operation'], kwargs['queries'], kwargs['rows']))
+
+    def test_sends_nothing_when_disabled(self):
+        instrumentation.disable()
+        self.nC.move(self.nA)
+        self.assertEqual([], self.reports)
+        self.assertEqual({}, instrumentation.stats.snapshot())
+
+    def test_reports_queries_and_rows_of_move(self):
+        self.nC.move(self.nD)
+        # savepoint, lock, re-read, shift and release, rewriting the lock row and four moved rows
+        self.assertEqual([(Node, 'move', 5, 5)], self.reports)
+
+    def test_reports_signal_handlers_with_model_of_sender(self):
+        Node.objects.create(name='E', parent=self.nD)
+        self.assertEqual([(Node, 'pre_save_node', 3, 3)], self.reports)
+
+    def test_nested_operations_are_counted_in_both(self):
+        with Node.objects.delay_tree_updates():
+            self.nB.delete()
+        operations = [(operation, queries) for _, operation, queries, _ in self.reports]
+        self.assertEqual(['pre_delete_node', 'pre_delete_node', 'delete'], [op for op, _ in operations])
+        self.assertEqual(0, operations[0][1])
+        self.assertLess(0, operations[-1][1])
+
+    def test_lazy_lookups_are_reported_when_evaluated(self):
+        descendants = self.nA.get_descendants()
+        ancestors = self.nC.get_ancestors(refresh=True)
+        self.assertEqual([], self.reports)
+        self.assertEqual(['B', 'A'], [node.name for node in ancestors])
+        self.assertEqual(['B', 'C', 'D'], [node.name for node in descendants])
+        list(descendants)
+        # the refreshed lookup re-reads the node when called and fetches the ancestors when evaluated
+        self.assertEqual([(Node, 'get_ancestors', 2, 0), (Node, 'get_descendants', 1, 0)], self.reports)
+
+    def test_stats_add_up_per_model_and_operation(self):
+        self.nA.get_ascii_tree()
+        self.nA.get_ascii_tree()
+        self.nB.bifurcate()
+        snapshot = instrumentation.stats.snapshot()
+        self.assertEqual(['bifurcate', 'get_ascii_tree'], sorted(snapshot['test_app.Node']))
+        ascii_tree = snapshot['test_app.Node']['get_ascii_tree']
+        self.assertEqual((2, 2, 0), (ascii_tree['calls'], ascii_tree['queries'], ascii_tree['rows']))
+        self.assertLessEqual(0, ascii_tree['seconds'])
+
+    def test_counts_executemany_and_restores_cursor(self):
+        with instrumentation.Measurement() as measurement:
+            cursor = connection.cursor()
+            cursor.executemany('UPDATE test_app_node SET name = %s WHERE name = %s', [('X', 'C'), ('Y', 'D')])
+            cursor.execute('SELECT name FROM test_app_node WHERE name = %s', ['X'])
+            self.assertEqual([('X',)], list(cursor))
+        self.assertEqual((2, 2), (measurement.queries, measurement.rows))
+        self.assertNotIn('cursor', connection.__dict__)
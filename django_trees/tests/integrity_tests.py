@@ -0,0 +1,150 @@
+from StringIO import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django_trees.exceptions import UnsupportedAction
+from django_trees.tests.test_app.models import Node, SparseNode, ClosureNode
+from django_trees.tests.helper import NodeTestHelper
+
+
+class IntegrityTests(TestCase, NodeTestHelper):
+
+    def setUp(self):
+        self.nA = self.create_node('A')
+        self.nB = self.create_node('B', self.nA)
+        self.nC = self.create_node('C', self.nB)
+        self.nD = self.create_node('D', self.nA)
+        self.tree_id = self.nA._tree_id
+
+    def corrupt(self, name, **columns):
+        Node.objects.filter(name=name).update(**columns)
+
+    def snapshot(self):
+        return [(n.name, n._left, n._right, n._depth) for n in Node.objects.order_by('_left')]
+
+    def test_consistent_tree_has_no_problems(self):
+        with self.assertNumQueries(1):
+            self.assertEqual([], Node.objects.check_tree(self.tree_id))
+
+    def test_sparse_tree_has_no_problems(self):
+        a = SparseNode.objects.create(name='A')
+        SparseNode.objects.create(name='B', parent=SparseNode.objects.create(name='C', parent=a))
+        self.assertEqual([], SparseNode.objects.check_tree(a._tree_id))
+
+    def test_reports_gap_in_dense_edges(self):
+        self.corrupt('D', _left=7, _right=8)
+        self.assertEqual(sorted([
+            'node {}: _left is 7, expected 6'.format(self.nD.pk),
+            'node {}: _right is 8, expected 9'.format(self.nA.pk),
+            'node {}: _right 8 does not fit between _left 7 and its parent'.format(self.nD.pk),
+        ]), sorted(Node.objects.check_tree(self.tree_id)))
+
+    def test_reports_edges_out_of_order_in_sparse_tree(self):
+        a = SparseNode.objects.create(name='A')
+        b = SparseNode.objects.create(name='B', parent=a)
+        SparseNode.objects.filter(pk=b.pk).update(_right=b._left)
+        self.assertEqual([
+            'node {}: _right 2 does not fit between _left 2 and its parent'.format(b.pk),
+            'node {}: _right is 2, expected more than 2'.format(b.pk),
+        ], sorted(SparseNode.objects.check_tree(a._tree_id)))
+
+    def test_reports_wrong_parent_and_depth(self):
+        self.corrupt('C', _parent=self.nD, _depth=1)
+        self.assertEqual([
+            'node {}: _depth is 1, expected 2'.format(self.nC.pk),
+            'node {}: _parent is {}, edges put it under {}'.format(self.nC.pk, self.nD.pk, self.nB.pk),
+        ], sorted(Node.objects.check_tree(self.tree_id)))
+
+    def test_reports_extra_roots(self):
+        self.corrupt('D', _parent=None, _depth=0, _left=9, _right=10)
+        self.assertEqual([
+            'node {}: _right is 8, expected 6'.format(self.nA.pk),
+            'tree has 2 roots',
+        ], Node.objects.check_tree(self.tree_id))
+
+    def test_rebuild_from_parent_links(self):
+        self.corrupt('C', _parent=self.nD)
+        self.assertEqual(3, Node.objects.rebuild(self.tree_id))
+        self.assertEqual([('A', 1, 8, 0), ('B', 2, 3, 1), ('D', 4, 7, 1), ('C', 5, 6, 2)], self.snapshot())
+        self.assertEqual([], Node.objects.check_tree(self.tree_id))
+
+    def test_rebuild_gives_nodes_without_parent_a_tree_of_their_own(self):
+        self.corrupt('D', _parent=None)
+        cursor = connection.cursor()
+        cursor.execute('DELETE FROM test_app_node WHERE id = %s', [self.nB.pk])
+        Node.objects.rebuild(self.tree_id)
+        c, d = Node.objects.get(pk=self.nC.pk), Node.objects.get(pk=self.nD.pk)
+        self.assertEqual([None, None], [c._parent_id, d._parent_id])
+        self.assertEqual(3, len(set([self.tree_id, c._tree_id, d._tree_id])))
+        for tree_id in (self.tree_id, c._tree_id, d._tree_id):
+            self.assertEqual([], Node.objects.check_tree(tree_id))
+
+    def test_rebuild_takes_along_the_tree_of_a_parent_outside(self):
+        v = self.create_node('V')
+        self.corrupt('B', _parent=v)
+        Node.objects.rebuild(self.tree_id)
+        self.assertEqual([], Node.objects.check_tree(self.tree_id))
+        self.assertEqual([], Node.objects.check_tree(v._tree_id))
+        self.assertEqual(['B', 'C'], [node.name for node in v.get_descendants(refresh=True)])
+
+    def test_rebuild_of_consistent_tree_writes_nothing(self):
+        with self.assertNumQueries(4):
+            self.assertEqual(0, Node.objects.rebuild(self.tree_id))
+
+    def test_rebuild_writes_changed_rows_in_batches(self):
+        pairs = [(Node(name='N{}'.format(i)), None) for i in range(250)]
+        Node.objects.bulk_create_tree(pairs, parent=self.nC)
+        self.corrupt('C', _left=100)
+        Node.objects.filter(_tree_id=self.tree_id, _depth=3).update(_depth=4)
+        with self.assertNumQueries(7):
+            self.assertEqual(251, Node.objects.rebuild(self.tree_id))
+        self.assertEqual([], Node.objects.check_tree(self.tree_id))
+
+    def test_closure_trees_have_no_edges_to_check(self):
+        with self.assertRaises(UnsupportedAction):
+            ClosureNode.objects.check_tree(self.tree_id)
+        with self.assertRaises(UnsupportedAction):
+            ClosureNode.objects.rebuild(self.tree_id)
+
+
+class RebuildTreesCommandTests(TestCase, NodeTestHelper):
+
+    def setUp(self):
+        self.nA = self.create_node('A')
+        self.nB = self.create_node('B', self.nA)
+        self.nV = self.create_node('V')
+        Node.objects.filter(pk=self.nB.pk).update(_depth=5)
+
+    def call(self, *args, **options):
+        out = StringIO()
+        call_command('rebuild_trees', *args, stdout=out, **options)
+        return out.getvalue().splitlines()
+
+    def test_rebuilds_broken_trees(self):
+        self.assertEqual([
+            'test_app.Node tree {}: node {}: _depth is 5, expected 1'.format(self.nA._tree_id, self.nB.pk),
+            '2 trees checked, 1 broken, 1 rebuilt',
+        ], self.call('test_app.Node', processes=1))
+        self.assertEqual(1, Node.objects.get(pk=self.nB.pk)._depth)
+
+    def test_rebuilds_nodes_hanging_from_another_tree(self):
+        Node.objects.filter(pk=self.nB.pk).update(_parent=self.nV)
+        self.call('test_app.Node', processes=1)
+        self.assertEqual(['B'], [node.name for node in self.nV.get_descendants(refresh=True)])
+        self.assertEqual('0 broken', self.call('test_app.Node', check=True, processes=1)[-1].split(', ')[1])
+
+    def test_check_only(self):
+        output = self.call('test_app.Node', check=True, processes=1)
+        self.assertEqual('2 trees checked, 1 broken, 0 rebuilt', output[-1])
+        self.assertEqual(5, Node.objects.get(pk=self.nB.pk)._depth)
+
+    def test_checks_trees_in_worker_processes(self):
+        output = self.call('test_app.Node', check=True, processes=2)
+        self.assertEqual('2 trees checked, 1 broken, 0 rebuilt', output[-1])
+
+    def test_unknown_model(self):
+        with self.assertRaises(CommandError):
+            self.call('test_app.Missing')
+        with self.assertRaises(CommandError):
+            self.call('Node')
@@ -0,0 +1,53 @@
+from django.test import TestCase
+from django_trees.tests.test_app.models import Node, SparseNode
+from django_trees.tests.helper import NodeTestHelper
+
+
+class IterTreeTests(TestCase, NodeTestHelper):
+
+    def setUp(self):
+        self.nA = self.create_node('A')
+        self.nB = self.create_node('B', self.nA)
+        self.nC = self.create_node('C', self.nB)
+        self.nD = self.create_node('D', self.nB)
+        self.nE = self.create_node('E', self.nA)
+        self.nF = self.create_node('F', self.nE)
+
+    def summary(self, model, root):
+        return [(node.name,) + tuple(info) for node, info in model.objects.iter_tree(root)]
+
+    def test_streams_tree_in_one_query(self):
+        with self.assertNumQueries(1):
+            rows = self.summary(Node, self.nA)
+        self.assertEqual([
+            ('A', 0, False, True, 1, 0),
+            ('B', 1, False, False, 1, 0),
+            ('C', 2, True, False, 1, 0),
+            ('D', 2, True, True, 0, 1),
+            ('E', 1, False, True, 0, 0),
+            ('F', 2, True, True, 1, 3),
+        ], rows)
+
+    def test_levels_are_relative_to_root(self):
+        self.assertEqual([
+            ('B', 0, False, True, 1, 0),
+            ('C', 1, True, False, 1, 0),
+            ('D', 1, True, True, 0, 2),
+        ], self.summary(Node, self.nB))
+
+    def test_single_leaf(self):
+        self.assertEqual([('F', 0, True, True, 1, 1)], self.summary(Node, self.nF))
+
+    def test_sparse_edges(self):
+        a = SparseNode.objects.create(name='A')
+        b = SparseNode.objects.create(name='B', parent=a)
+        SparseNode.objects.create(name='C', parent=b)
+        SparseNode.objects.create(name='D', parent=a)
+        with self.assertNumQueries(1):
+            rows = self.summary(SparseNode, a)
+        self.assertEqual([
+            ('A', 0, False, True, 1, 0),
+            ('B', 1, False, False, 1, 0),
+            ('C', 2, True, True, 1, 1),
+            ('D', 1, True, True, 0, 2),
+        ], rows)
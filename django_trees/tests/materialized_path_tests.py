@@ -0,0 +1,113 @@
+from django.db import connection, models
+from django.test import TestCase
+from django_trees.tests.test_app.models import Node, PathNode
+
+
+class MaterializedPathTests(TestCase):
+
+    def setUp(self):
+        self.a = PathNode.objects.create(name='A')
+        self.b = PathNode.objects.create(name='B', parent=self.a)
+        self.c = PathNode.objects.create(name='C', parent=self.b)
+        self.d = PathNode.objects.create(name='D', parent=self.a)
+
+    def paths(self):
+        return dict((node.name, node._path) for node in PathNode.objects.all())
+
+    def path_of(self, *nodes):
+        return ''.join('{}/'.format(node.pk) for node in nodes)
+
+    def test_path_column_is_only_added_when_enabled(self):
+        self.assertEqual(['_path'], [f.name for f in PathNode._meta.fields if f.name == '_path'])
+        self.assertIsInstance(PathNode._meta.get_field('_path'), models.TextField)
+        self.assertTrue(PathNode._meta.get_field('_path').db_index)
+        self.assertFalse([f for f in Node._meta.fields if f.name == '_path'])
+
+    def test_insert_sets_path_of_ancestors(self):
+        self.assertEqual({
+            'A': '',
+            'B': self.path_of(self.a),
+            'C': self.path_of(self.a, self.b),
+            'D': self.path_of(self.a),
+        }, self.paths())
+
+    def test_descendants_use_path_prefix(self):
+        with self.assertNumQueries(1):
+            self.assertEqual([self.b, self.c, self.d], list(self.a.get_descendants()))
+        self.assertEqual([self.c], list(self.b.get_descendants()))
+        self.assertEqual([], list(self.c.get_descendants()))
+
+    def test_descendants_do_not_match_longer_primary_keys(self):
+        for name in 'EFGHIJKL':
+            PathNode.objects.create(name=name)
+        node = PathNode.objects.create(name='M', parent=PathNode.objects.get(pk=10 + self.a.pk))
+        self.assertTrue(node._path.startswith(str(self.a.pk)))
+        self.assertEqual([self.b, self.c, self.d], list(self.a.get_descendants()))
+
+    def test_ancestors_resolve_path_to_primary_keys(self):
+        with self.assertNumQueries(2):
+            self.assertEqual([self.b, self.a], list(self.c.get_ancestors()))
+        with self.assertNumQueries(1):
+            self.assertEqual([], list(self.a.get_ancestors()))
+
+    def test_lookups_use_current_path_of_stale_instance(self):
+        stale_b, stale_c = PathNode.objects.get(pk=self.b.pk), PathNode.objects.get(pk=self.c.pk)
+        v = PathNode.objects.create(name='V')
+        self.b.move(v)
+        with self.assertNumQueries(1):
+            self.assertEqual([self.c], list(stale_b.get_descendants()))
+        self.assertEqual([v], list(stale_b.get_ancestors()))
+        self.assertEqual([self.b, v], list(stale_c.get_ancestors()))
+        self.assertEqual([self.d], list(self.a.get_descendants()))
+
+    def test_other_databases_match_path_prefix_with_like(self):
+        for name in 'EFGHIJKL':
+            PathNode.objects.create(name=name)
+        PathNode.objects.create(name='M', parent=PathNode.objects.get(pk=10 + self.a.pk))
+        vendor, connection.vendor = connection.vendor, 'mysql'
+        try:
+            self.assertEqual([self.b, self.c, self.d], list(self.a.get_descendants()))
+            self.assertEqual([self.b, self.c, self.d], list(self.a.get_descendants(refresh=True)))
+        finally:
+            connection.vendor = vendor
+
+    def test_move_within_tree_rewrites_paths(self):
+        self.b.move(self.d)
+        self.assertEqual({
+            'A': '',
+            'B': self.path_of(self.a, self.d),
+            'C': self.path_of(self.a, self.d, self.b),
+            'D': self.path_of(self.a),
+        }, self.paths())
+        self.assertEqual([self.b, self.d, self.a], list(self.c.get_ancestors(refresh=True)))
+
+    def test_move_to_other_tree_rewrites_paths(self):
+        v = PathNode.objects.create(name='V')
+        self.b.move(v)
+        self.assertEqual({
+            'A': '',
+            'B': self.path_of(v),
+            'C': self.path_of(v, self.b),
+            'D': self.path_of(self.a),
+            'V': '',
+        }, self.paths())
+        self.assertEqual([self.b, self.c], list(v.get_descendants()))
+
+    def test_bifurcate_rewrites_paths(self):
+        self.b.bifurcate()
+        self.assertEqual({'A': '', 'B': '', 'C': self.path_of(self.b), 'D': self.path_of(self.a)}, self.paths())
+        self.assertEqual([self.d], list(self.a.get_descendants(refresh=True)))
+
+    def test_bulk_create_tree_links_paths(self):
+        x, y, z = PathNode(name='X'), PathNode(name='Y'), PathNode(name='Z')
+        PathNode.objects.bulk_create_tree([(x, None), (y, x), (z, y)])
+        x, y = PathNode.objects.get(name='X'), PathNode.objects.get(name='Y')
+        self.assertEqual(['', self.path_of(x), self.path_of(x, y)], [
+            node._path for node in PathNode.objects.filter(name__in='XYZ').order_by('_left')])
+
+    def test_bulk_create_tree_under_parent_links_paths(self):
+        PathNode.objects.bulk_create_tree([(PathNode(name='X'), [(PathNode(name='Y'), [])])], parent=self.c)
+        x = PathNode.objects.get(name='X')
+        self.assertEqual(self.path_of(self.a, self.b, self.c), x._path)
+        self.assertEqual(self.path_of(self.a, self.b, self.c, x), PathNode.objects.get(name='Y')._path)
+        self.assertEqual(self.path_of(self.a), PathNode.objects.get(name='D')._path)
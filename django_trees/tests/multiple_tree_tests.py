@@ -1,5 +1,7 @@
 from django.test import TestCase
+from django_trees.managers import TREE_INDEXES
 from django_trees.tests.helper import NodeTestHelper
+from django_trees.tests.test_app.models import Node
 
 
 class MutipleTreeTests(TestCase, NodeTestHelper):
@@ -12,6 +14,10 @@ class MutipleTreeTests(TestCase, NodeTestHelper):
         self.nW = self.create_node("W", self.nV)
         self.nX = self.create_node("X", self.nV)
 
+    def test_tree_columns_are_indexed_together(self):
+        for fields in TREE_INDEXES:
+            self.assertIn(fields, Node._meta.index_together)
+
     def test_deleting_from_one_tree_does_not_affect_another(self):
         self.nB.delete()
         self.assertEqual(list(self.nA.get_descendants()), [])
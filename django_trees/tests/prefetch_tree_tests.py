@@ -0,0 +1,67 @@
+from django.test import TestCase
+from django_trees.exceptions import UnsupportedAction
+from django_trees.tests.test_app.models import Node, ClosureNode
+from django_trees.tests.helper import NodeTestHelper
+
+
+class PrefetchTreeTests(TestCase, NodeTestHelper):
+
+    def setUp(self):
+        self.create_node('A')
+        self.create_node('B', self.nA)
+        self.create_node('C', self.nB)
+        self.create_node('D', self.nA)
+        self.create_node('X')
+        self.create_node('Y', self.nX)
+
+    def names(self, nodes):
+        return [node.name for node in nodes]
+
+    def walk(self, node):
+        return [node.name] + [name for child in node.get_children() for name in self.walk(child)]
+
+    def test_loads_roots_with_one_query_per_tree(self):
+        with self.assertNumQueries(3):
+            roots = list(Node.objects.filter(_depth=0).order_by('name').prefetch_tree())
+        with self.assertNumQueries(0):
+            self.assertEqual([['A', 'B', 'C', 'D'], ['X', 'Y']], [self.walk(root) for root in roots])
+            self.assertEqual(['B', 'C', 'D'], self.names(roots[0].get_descendants()))
+
+    def test_parent_and_ancestors_come_from_prefetched_tree(self):
+        c = Node.objects.prefetch_tree().get(name='C')
+        with self.assertNumQueries(0):
+            self.assertEqual('B', c.parent.name)
+            self.assertEqual(['B', 'A'], self.names(c.get_ancestors()))
+            self.assertIsNone(c.parent.parent.parent)
+
+    def test_only_complete_subtrees_answer_children_from_memory(self):
+        c, d = Node.objects.filter(name__in=['C', 'D']).order_by('_left').prefetch_tree()
+        with self.assertNumQueries(0):
+            self.assertEqual([], d.get_children())
+            self.assertEqual(['B', 'A'], self.names(c.get_ancestors()))
+        a = d.parent
+        with self.assertNumQueries(1):
+            self.assertEqual(['B', 'D'], self.names(a.get_children()))
+
+    def test_children_are_the_prefetched_instances(self):
+        b, c = Node.objects.filter(name__in=['B', 'C']).order_by('_left').prefetch_tree()
+        self.assertIs(c, b.get_children()[0])
+        self.assertIs(b, c.parent)
+
+    def test_refresh_bypasses_prefetched_tree(self):
+        c = Node.objects.prefetch_tree().get(name='C')
+        self.nC.move(self.nD)
+        self.assertEqual(['B', 'A'], self.names(c.get_ancestors()))
+        self.assertEqual(['D', 'A'], self.names(c.get_ancestors(refresh=True)))
+
+    def test_prefetch_trees_accepts_list_and_keeps_flag_on_clones(self):
+        nodes = Node.objects.prefetch_trees([self.nB, self.nY])
+        with self.assertNumQueries(0):
+            self.assertEqual([['B', 'C'], ['Y']], [self.walk(node) for node in nodes])
+        queryset = Node.objects.filter(_depth=0).prefetch_tree()
+        self.assertTrue(queryset.exclude(name='X')._prefetch_tree)
+        self.assertFalse(Node.objects.filter(_depth=0)._prefetch_tree)
+
+    def test_closure_trees_cannot_prefetch(self):
+        with self.assertRaises(UnsupportedAction):
+            list(ClosureNode.objects.prefetch_tree())
@@ -0,0 +1,157 @@
+from django.test import TestCase
+from django_trees.cache import TreeCache
+from django_trees.exceptions import InvalidNodeMove, UnsupportedAction
+from django_trees.tests.test_app.models import Node, SparseNode, PathNode, ClosureNode
+from django_trees.tests.helper import NodeTestHelper
+
+
+class SiblingOrderTests(TestCase, NodeTestHelper):
+
+    def setUp(self):
+        self.nA = self.create_node('A')
+        self.nB = self.create_node('B', self.nA)
+        self.nE = self.create_node('E', self.nB)
+        self.nC = self.create_node('C', self.nA)
+        self.nD = self.create_node('D', self.nA)
+        self.nV = self.create_node('V')
+
+    def children(self, node):
+        return [child.name for child in node.get_children().order_by('_left')]
+
+    def assertConsistent(self, model=Node):
+        for tree_id in set(model.objects.values_list('_tree_id', flat=True)):
+            self.assertEqual([], model.objects.check_tree(tree_id))
+
+    def test_insert_before(self):
+        node = Node(name='X')
+        with self.assertNumQueries(5):
+            node.insert_before(self.nC)
+        self.assertEqual(['B', 'X', 'C', 'D'], self.children(self.nA))
+        self.assertEqual(self.nA, node.parent)
+        self.assertEqual(1, node._depth)
+        self.assertConsistent()
+
+    def test_insert_after_node_with_children(self):
+        Node(name='X').insert_after(self.nB)
+        self.assertEqual(['B', 'X', 'C', 'D'], self.children(self.nA))
+        self.assertEqual(['E'], self.children(self.nB))
+        self.assertConsistent()
+
+    def test_insert_after_last_child(self):
+        Node(name='X').insert_after(self.nD)
+        self.assertEqual(['B', 'C', 'D', 'X'], self.children(self.nA))
+        self.assertConsistent()
+
+    def test_insert_into_sparse_tree(self):
+        a = SparseNode.objects.create(name='A')
+        b = SparseNode.objects.create(name='B', parent=a)
+        SparseNode(name='X').insert_before(b)
+        SparseNode.objects.create(name='C', parent=a)
+        self.assertEqual(['X', 'B', 'C'], [n.name for n in a.get_children().order_by('_left')])
+        self.assertConsistent(SparseNode)
+
+    def test_cannot_insert_next_to_root(self):
+        with self.assertRaises(InvalidNodeMove):
+            Node(name='X').insert_before(self.nA)
+
+    def test_existing_node_must_be_moved(self):
+        with self.assertRaises(UnsupportedAction):
+            self.nD.insert_before(self.nB)
+
+    def test_move_to_positions_within_tree(self):
+        self.nD.move_to(self.nB, 'before')
+        self.assertEqual(['D', 'B', 'C'], self.children(self.nA))
+        self.nB.move_to(self.nC, 'after')
+        self.assertEqual(['D', 'C', 'B'], self.children(self.nA))
+        self.nC.move_to(self.nB, 'last-child')
+        self.assertEqual(['D', 'B'], self.children(self.nA))
+        self.assertEqual(['E', 'C'], self.children(self.nB))
+        self.nE.move_to(self.nA, 'first-child')
+        self.assertEqual(['E', 'D', 'B'], self.children(self.nA))
+        self.assertConsistent()
+
+    def test_move_to_other_tree(self):
+        w = self.create_node('W', self.nV)
+        self.nB.move_to(w, 'before')
+        self.assertEqual(['B', 'W'], self.children(self.nV))
+        self.assertEqual(['E'], self.children(self.nB))
+        self.assertEqual(2, Node.objects.get(name='E')._depth)
+        self.assertConsistent()
+
+    def test_move_to_uses_constant_number_of_queries(self):
+        with self.assertNumQueries(6):
+            self.nB.move_to(self.nD, 'after')
+
+    def test_move_to_rejects_invalid_targets(self):
+        with self.assertRaises(InvalidNodeMove):
+            self.nB.move_to(self.nE, 'after')
+        with self.assertRaises(InvalidNodeMove):
+            self.nB.move_to(self.nB, 'before')
+        with self.assertRaises(InvalidNodeMove):
+            self.nB.move_to(self.nV, 'before')
+        with self.assertRaises(ValueError):
+            self.nB.move_to(self.nC, 'inside')
+
+    def test_reorder_children_without_recreating_them(self):
+        children = [self.create_node('N{}'.format(i), self.nV) for i in range(30)]
+        for child in children[:-1]:
+            child.move_to(children[-1], 'after')
+        self.assertEqual(
+            [child.pk for child in reversed(children)],
+            [child.pk for child in self.nV.get_children().order_by('_left')])
+        self.assertConsistent()
+
+    def test_move_to_keeps_materialized_paths(self):
+        a = PathNode.objects.create(name='A')
+        b = PathNode.objects.create(name='B', parent=a)
+        c = PathNode.objects.create(name='C', parent=b)
+        c.move_to(b, 'before')
+        self.assertEqual('{}/'.format(a.pk), PathNode.objects.get(pk=c.pk)._path)
+
+    def test_next_and_previous_sibling(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.nC, self.nB.get_next_sibling())
+        with self.assertNumQueries(1):
+            self.assertEqual(self.nC, self.nD.get_previous_sibling())
+        self.assertEqual(None, self.nD.get_next_sibling())
+        self.assertEqual(None, self.nB.get_previous_sibling())
+        self.assertEqual(None, self.nA.get_next_sibling())
+
+    def test_next_and_previous_sibling_from_cache(self):
+        with TreeCache():
+            self.nA.get_children()
+            with self.assertNumQueries(0):
+                self.assertEqual(self.nC, self.nB.get_next_sibling())
+                self.assertEqual(self.nC, self.nD.get_previous_sibling())
+                self.assertEqual(None, self.nD.get_next_sibling())
+                self.assertEqual(None, self.nB.get_previous_sibling())
+
+    def test_next_sibling_skips_gaps_in_sparse_tree(self):
+        a = SparseNode.objects.create(name='A')
+        b = SparseNode.objects.create(name='B', parent=a)
+        c = SparseNode.objects.create(name='C', parent=a)
+        self.assertEqual(c, b.get_next_sibling())
+        self.assertEqual(b, c.get_previous_sibling())
+
+
+class ClosureSiblingTests(TestCase):
+
+    def setUp(self):
+        self.a = ClosureNode.objects.create(name='A')
+        self.b = ClosureNode.objects.create(name='B', parent=self.a)
+        self.c = ClosureNode.objects.create(name='C', parent=self.a)
+
+    def test_siblings_follow_primary_key_order(self):
+        self.assertEqual(self.c, self.b.get_next_sibling())
+        self.assertEqual(self.b, self.c.get_previous_sibling())
+        self.assertEqual(None, self.c.get_next_sibling())
+
+    def test_positions_between_siblings_are_unsupported(self):
+        with self.assertRaises(UnsupportedAction):
+            ClosureNode(name='X').insert_before(self.b)
+        with self.assertRaises(UnsupportedAction):
+            self.c.move_to(self.b, 'before')
+
+    def test_move_to_last_child(self):
+        self.c.move_to(self.b, 'last-child')
+        self.assertEqual([self.c], list(self.b.get_children()))
@@ -0,0 +1,81 @@
+from django.test import TestCase
+from textwrap import dedent
+from django_trees.tests.test_app.models import SparseNode
+
+
+class SparseTreeTests(TestCase):
+
+    def setUp(self):
+        self.a = SparseNode.objects.create(name='A')
+        self.b = SparseNode.objects.create(name='B', parent=self.a)
+        self.c = SparseNode.objects.create(name='C', parent=self.a)
+
+    def refresh(self, *nodes):
+        return [SparseNode.objects.get(pk=node.pk) for node in nodes]
+
+    def snapshot(self):
+        return dict((n.pk, n.edges) for n in SparseNode.objects.all())
+
+    def test_root_reserves_gap(self):
+        self.assertEqual((1, 8), SparseNode.objects.create(name='R').edges)
+
+    def test_children_take_half_of_the_free_edges(self):
+        a, b, c = self.refresh(self.a, self.b, self.c)
+        self.assertEqual((1, 8), a.edges)
+        self.assertEqual((2, 5), b.edges)
+        self.assertEqual((6, 7), c.edges)
+
+    def test_insert_with_room_updates_no_other_rows(self):
+        before = self.snapshot()
+        with self.assertNumQueries(4):
+            d = SparseNode.objects.create(name='D', parent=self.b)
+        after = self.snapshot()
+        del after[d.pk]
+        self.assertEqual(before, after)
+
+    def test_full_tree_is_spread_over_a_wider_root(self):
+        SparseNode.objects.create(name='D', parent=self.a)
+        a, b, c, d = self.refresh(self.a, self.b, self.c, SparseNode.objects.get(name='D'))
+        self.assertEqual((1, 112), a.edges)
+        self.assertEqual([(16, 32), (48, 64), (80, 96)], [b.edges, c.edges, d.edges])
+        self.assertEqual(['B', 'C', 'D'], [n.name for n in a.get_descendants()])
+
+    def test_rebalance_stays_inside_nearest_subtree_with_room(self):
+        children = [SparseNode.objects.create(name=str(i), parent=self.c) for i in range(12)]
+        before = self.snapshot()
+        for name in 'WXYZ':
+            SparseNode.objects.create(name=name, parent=children[3])
+        after = self.snapshot()
+        moved = set(pk for pk, edges in before.items() if after[pk] != edges)
+        self.assertEqual(set(child.pk for child in children), moved)
+        self.assertEqual([], SparseNode.objects.check_tree(self.a._tree_id))
+        self.assertEqual(['W', 'X', 'Y', 'Z'], [n.name for n in children[3].get_descendants()])
+
+    def test_queries_work_across_gaps(self):
+        d = SparseNode.objects.create(name='D', parent=self.b)
+        e = SparseNode.objects.create(name='E', parent=d)
+        self.assertEqual(list(e.get_ancestors()), [d, self.b, self.a])
+        self.assertEqual(list(self.a.get_descendants()), [self.b, d, e, self.c])
+        self.assertEqual(dedent("""
+        A
+         +-- B
+         |    +-- D
+         |         +-- E
+         +-- C
+        """).strip(), self.a.get_ascii_tree())
+
+    def test_descendant_count_counts_across_gaps(self):
+        SparseNode.objects.create(name='D', parent=self.b)
+        self.assertEqual(3, self.a.descendant_count)
+        self.assertEqual(1, self.b.descendant_count)
+        self.assertEqual(0, self.c.descendant_count)
+
+    def test_move_and_delete_keep_gaps_consistent(self):
+        d = SparseNode.objects.create(name='D', parent=self.b)
+        self.b.move(self.c)
+        self.assertEqual(list(self.a.get_descendants()), [self.c, self.b, d])
+        SparseNode.objects.get(pk=self.b.pk).delete()
+        self.assertEqual(list(self.a.get_descendants()), [self.c])
+        a, c = self.refresh(self.a, self.c)
+        self.assertEqual((1, 4), a.edges)
+        self.assertEqual((2, 3), c.edges)
@@ -1,4 +1,7 @@
+from django.db import connection
+from django.db.models.signals import post_delete
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django_trees.tests.test_app.models import Node
 from django_trees.exceptions import InvalidNodeMove
 from django_trees.tests.helper import NodeTestHelper
@@ -27,6 +30,37 @@ class StraightTreeTests(TestCase, NodeTestHelper):
         self.assertEqual(list(self.nD.get_descendants()), [self.nE])
         self.assertEqual(list(self.nE.get_descendants()), [])
 
+    def test_get_ancestors_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(list(self.nC.get_ancestors()), [self.nB, self.nA])
+
+    def test_get_descendants_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(list(self.nC.get_descendants()), [self.nD, self.nE])
+
+    def test_lookups_use_current_edges_of_stale_instance(self):
+        stale = Node.objects.get(pk=self.nE.pk)
+        self.nF = self.create_node("F", self.nE)
+        self.assertEqual(list(stale.get_descendants()), [self.nF])
+        self.assertEqual(list(self.nF.get_ancestors()), [self.nE, self.nD, self.nC, self.nB, self.nA])
+
+    def test_refresh_re_fetches_node_before_lookup(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(list(self.nC.get_ancestors(refresh=True)), [self.nB, self.nA])
+        with self.assertNumQueries(2):
+            self.assertEqual(list(self.nC.get_descendants(refresh=True)), [self.nD, self.nE])
+
+    def test_descendant_count_is_worked_out_from_edges(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(4, self.nA.descendant_count)
+        self.assertEqual(3, self.nB.descendant_count)
+        self.assertEqual(0, self.nE.descendant_count)
+
+    def test_descendant_count_uses_current_edges_of_stale_instance(self):
+        stale = Node.objects.get(pk=self.nE.pk)
+        self.create_node("F", self.nE)
+        self.assertEqual(1, stale.descendant_count)
+
     def test_newly_added_nodes_receive_correct_attributes(self):
         self.assertEqual((1, 10), self.nA.edges)
         self.assertEqual((2, 9), self.nB.edges)
@@ -47,6 +81,37 @@ class StraightTreeTests(TestCase, NodeTestHelper):
         self.assertEqual((3, 4), self.nC.edges)
         self.assertEqual(0, Node.objects.filter(pk=self.nE.pk).count())
 
+    def test_delete_subtree_removes_range_with_constant_queries(self):
+        with self.assertNumQueries(6):
+            Node.objects.delete_subtree(self.nC)
+        self.assertIsNone(self.nC.pk)
+        self.refresh_node_instances()
+        self.assertEqual((1, 4), self.nA.edges)
+        self.assertEqual((2, 3), self.nB.edges)
+        self.assertEqual(['A', 'B'], [n.name for n in Node.objects.order_by('_left')])
+        self.nB.delete()
+        self.assertIsNone(self.nB.pk)
+
+    def test_delete_falls_back_to_collector_when_receivers_are_registered(self):
+        deleted = []
+
+        def receiver(sender, instance, **kwargs):
+            deleted.append(instance.name)
+
+        post_delete.connect(receiver, sender=Node)
+        c = Node.objects.get(pk=self.nC.pk)
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                c.delete()
+        finally:
+            post_delete.disconnect(receiver, sender=Node)
+        self.assertEqual(['C', 'D', 'E'], sorted(deleted))
+        # only C locks its tree, its cascaded descendants are just re-read
+        self.assertEqual(1, len([query for query in queries if '"_depth" = "_depth"' in query['sql']]))
+        self.refresh_node_instances()
+        self.assertEqual((1, 4), self.nA.edges)
+        self.assertEqual((2, 3), self.nB.edges)
+
     def test_cannot_move_parent_to_one_of_its_children(self):
         with self.assertRaises(InvalidNodeMove):
             self.nB.move(self.nD)
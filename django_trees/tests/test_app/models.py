@@ -1,4 +1,6 @@
 from django_trees.models import AbstractNode
+from django_trees.managers import NodeManager
+from django_trees.closure import ClosureNodeManager
 from django.db import models
 
 
@@ -14,4 +16,36 @@ class Node(AbstractNode):
 
     @property
     def max_tree_depth(self):
-        return Node.objects.filter(_tree_id=self._tree_id).order_by('-_depth')[0]._depth
+        return Node.objects.tree_stats([self._tree_id])[self._tree_id].max_depth
+
+
+class SparseNode(AbstractNode):
+    name = models.CharField(max_length=100)
+    objects = NodeManager(edge_gap=6)
+
+    def __unicode__(self):
+        return self.name
+
+    @property
+    def edges(self):
+        return self._left, self._right
+
+
+class CompactNode(AbstractNode):
+    name = models.CharField(max_length=100)
+    objects = NodeManager(tree_id_type='int')
+
+
+class PathNode(AbstractNode):
+    name = models.CharField(max_length=100)
+    objects = NodeManager(materialized_path=True)
+
+
+class SummaryNode(AbstractNode):
+    name = models.CharField(max_length=100)
+    objects = NodeManager(tree_summary=True)
+
+
+class ClosureNode(AbstractNode):
+    name = models.CharField(max_length=100)
+    objects = ClosureNodeManager()
@@ -0,0 +1,107 @@
+from django.http import HttpResponse
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django_trees.cache import TreeCache
+from django_trees.middleware import TreeCacheMiddleware
+from django_trees.tests.test_app.models import Node
+from django_trees.tests.helper import NodeTestHelper
+
+
+class TreeCacheTests(TestCase, NodeTestHelper):
+
+    def setUp(self):
+        self.nA = self.create_node('A')
+        self.nB = self.create_node('B', self.nA)
+        self.nC = self.create_node('C', self.nA)
+        self.nD = self.create_node('D', self.nC)
+        self.nE = self.create_node('E', self.nC)
+
+    def test_lookups_are_answered_from_one_query(self):
+        with TreeCache():
+            with self.assertNumQueries(1):
+                self.assertEqual(self.nD.get_ancestors(), [self.nC, self.nA])
+                self.assertEqual(self.nA.get_descendants(), [self.nB, self.nC, self.nD, self.nE])
+                self.assertEqual(self.nC.get_descendants(), [self.nD, self.nE])
+                self.assertEqual(self.nA.get_children(), [self.nB, self.nC])
+                self.assertEqual(self.nD.get_siblings(), [self.nE])
+                self.assertEqual(self.nA.get_siblings(), [])
+
+    def test_lookups_outside_cache_hit_database(self):
+        self.assertEqual(list(self.nD.get_siblings()), [self.nE])
+        self.assertEqual(list(self.nA.get_siblings()), [])
+        self.assertEqual(TreeCache.active(), None)
+
+    def test_insert_invalidates_tree(self):
+        with TreeCache():
+            self.assertEqual(self.nB.get_children(), [])
+            f = self.create_node('F', self.nB)
+            self.assertEqual(self.nB.get_children(), [f])
+
+    def test_move_invalidates_tree(self):
+        with TreeCache():
+            self.assertEqual(self.nD.get_ancestors(), [self.nC, self.nA])
+            self.nD.move(self.nB)
+            self.assertEqual(self.nD.get_ancestors(), [self.nB, self.nA])
+
+    def test_bifurcate_invalidates_tree(self):
+        with TreeCache():
+            self.assertEqual(len(self.nA.get_descendants()), 4)
+            self.nC.bifurcate()
+            self.assertEqual(self.nA.get_descendants(), [self.nB])
+            self.assertEqual(self.nE.get_ancestors(), [self.nC])
+
+    def test_delete_invalidates_tree(self):
+        with TreeCache():
+            self.assertEqual(len(self.nA.get_descendants()), 4)
+            Node.objects.get(pk=self.nC.pk).delete()
+            self.assertEqual(self.nA.get_descendants(), [self.nB])
+
+    def test_delayed_updates_invalidate_tree(self):
+        with TreeCache():
+            with Node.objects.delay_tree_updates():
+                self.assertEqual(self.nD.get_siblings(), [self.nE])
+                self.nD.move(self.nB)
+                self.assertEqual(self.nD.get_siblings(), [])
+                self.assertEqual(self.nC.get_children(), [self.nE])
+                Node.objects.get(pk=self.nE.pk).delete()
+                self.assertEqual(self.nC.get_children(), [])
+            self.assertEqual(self.nA.get_descendants(), [self.nB, self.nD, self.nC])
+
+    def test_lookups_on_deleted_node_fall_back_to_database(self):
+        Node.objects.get(pk=self.nD.pk).delete()
+        with TreeCache():
+            self.assertEqual([], list(self.nD.get_descendants()))
+            self.assertEqual([], list(self.nD.get_ancestors()))
+            self.assertEqual([], list(self.nD.get_siblings()))
+            self.assertIsNone(self.nD.get_next_sibling())
+
+    def test_other_trees_stay_cached(self):
+        self.nV = self.create_node('V')
+        with TreeCache():
+            self.nV.get_descendants()
+            self.create_node('F', self.nB)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.nV.get_descendants(), [])
+
+    def test_nested_caches_are_stacked(self):
+        with TreeCache() as outer:
+            with TreeCache() as inner:
+                self.assertIs(inner, TreeCache.active())
+            self.assertIs(outer, TreeCache.active())
+
+
+class TreeCacheMiddlewareTests(TestCase):
+
+    def test_cache_is_active_during_request(self):
+        middleware = TreeCacheMiddleware()
+        request = RequestFactory().get('/')
+        middleware.process_request(request)
+        self.assertIs(request.tree_cache, TreeCache.active())
+        response = middleware.process_response(request, HttpResponse())
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(None, TreeCache.active())
+
+    def test_response_without_request_processing(self):
+        request = RequestFactory().get('/')
+        response = TreeCacheMiddleware().process_response(request, HttpResponse())
+        self.assertEqual(200, response.status_code)
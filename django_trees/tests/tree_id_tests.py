@@ -0,0 +1,59 @@
+from django.db import models
+from django.test import TestCase
+from django_trees.tests.test_app.models import CompactNode, Node
+
+
+class CompactTreeIdTests(TestCase):
+
+    def setUp(self):
+        self.a = CompactNode.objects.create(name='A')
+        self.b = CompactNode.objects.create(name='B', parent=self.a)
+        self.c = CompactNode.objects.create(name='C', parent=self.b)
+
+    def test_tree_id_column_is_an_integer(self):
+        self.assertIsInstance(CompactNode._meta.get_field('_tree_id'), models.BigIntegerField)
+        self.assertIsInstance(CompactNode.objects.get(pk=self.c.pk)._tree_id, (int, long))
+
+    def test_bifurcate_allocates_new_integer_tree_id(self):
+        self.b.bifurcate()
+        a, b, c = [CompactNode.objects.get(pk=n.pk) for n in (self.a, self.b, self.c)]
+        self.assertNotEqual(a._tree_id, b._tree_id)
+        self.assertEqual(b._tree_id, c._tree_id)
+        self.assertEqual(list(c.get_ancestors()), [b])
+
+    def test_move_between_trees(self):
+        v = CompactNode.objects.create(name='V')
+        self.b.move(v)
+        self.assertEqual(list(self.c.get_ancestors()), [self.b, v])
+        self.assertEqual(list(self.a.get_descendants()), [])
+
+    def test_bulk_created_trees_get_integer_tree_ids(self):
+        x, y = CompactNode(name='X'), CompactNode(name='Y')
+        CompactNode.objects.bulk_create_tree([(x, [(y, [])])])
+        y = CompactNode.objects.get(name='Y')
+        self.assertEqual(list(y.get_ancestors()), [CompactNode.objects.get(name='X')])
+
+
+class RenumberTreeIdsTests(TestCase):
+
+    def test_rewrites_uuid_tree_ids_as_integers(self):
+        a = Node.objects.create(name='A')
+        b = Node.objects.create(name='B', parent=a)
+        v = Node.objects.create(name='V')
+        self.assertEqual(2, Node.objects.renumber_tree_ids())
+        tree_ids = dict((n.name, n._tree_id) for n in Node.objects.all())
+        self.assertEqual(['1', '2'], sorted(set(tree_ids.values())))
+        self.assertEqual(tree_ids['A'], tree_ids['B'])
+        self.assertNotEqual(tree_ids['A'], tree_ids['V'])
+        self.assertEqual(list(b.get_ancestors()), [a])
+        self.assertEqual(list(v.get_descendants()), [])
+
+    def test_running_again_never_merges_trees(self):
+        for name in range(12):
+            Node.objects.create(name=str(name))
+        self.assertEqual(12, Node.objects.renumber_tree_ids())
+        Node.objects.create(name='new')
+        self.assertEqual(13, Node.objects.renumber_tree_ids())
+        tree_ids = dict((n.name, n._tree_id) for n in Node.objects.all())
+        self.assertEqual(sorted(str(number) for number in range(1, 14)), sorted(tree_ids.values()))
+        self.assertEqual('13', tree_ids['new'])
@@ -0,0 +1,52 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django_trees.tests.test_app.models import Node, ClosureNode
+from django_trees.tests.helper import NodeTestHelper
+
+
+class TreeLockTests(TestCase, NodeTestHelper):
+
+    def setUp(self):
+        self.nA = self.create_node('A')
+        self.nB = self.create_node('B', self.nA)
+        self.nC = self.create_node('C', self.nB)
+        self.nV = self.create_node('V')
+
+    def locks(self, func, *args, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            func(*args, **kwargs)
+        return [query['sql'] for query in queries if 'SET "_depth" = "_depth" WHERE' in query['sql']]
+
+    def locked_trees(self, func, *args, **kwargs):
+        locks = self.locks(func, *args, **kwargs)
+        return [tree_id for tree_id in (self.nA._tree_id, self.nV._tree_id) for sql in locks if tree_id in sql]
+
+    def test_insert_locks_tree_of_parent(self):
+        self.assertEqual([self.nA._tree_id], self.locked_trees(Node.objects.create, name='D', parent=self.nB))
+
+    def test_insert_of_root_takes_no_lock(self):
+        self.assertEqual([], self.locked_trees(Node.objects.create, name='W'))
+
+    def test_move_locks_both_trees(self):
+        self.assertEqual(
+            sorted([self.nA._tree_id, self.nV._tree_id]), sorted(self.locked_trees(self.nC.move, self.nV)))
+
+    def test_delete_locks_tree(self):
+        self.assertEqual([self.nA._tree_id], self.locked_trees(self.nC.delete))
+
+    def test_stale_instance_locks_its_current_tree(self):
+        Node.objects.get(pk=self.nB.pk).move(self.nV)
+        locked = self.locked_trees(Node.objects.create, name='D', parent=self.nC)
+        self.assertEqual([self.nA._tree_id, self.nV._tree_id], locked)
+        self.assertEqual(self.nV._tree_id, Node.objects.get(name='D')._tree_id)
+
+    def test_node_deleted_meanwhile_raises_does_not_exist(self):
+        Node.objects.get(pk=self.nB.pk).delete()
+        with self.assertRaises(Node.DoesNotExist):
+            self.nC.move(self.nV)
+
+    def test_closure_move_locks_tree(self):
+        a = ClosureNode.objects.create(name='A')
+        b = ClosureNode.objects.create(name='B', parent=a)
+        self.assertEqual(1, len(self.locks(b.bifurcate)))
@@ -0,0 +1,95 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django_trees.managers import TreeSummary
+from django_trees.tests.test_app.models import Node, SparseNode, ClosureNode, SummaryNode
+
+
+class TreeStatsTests(TestCase):
+
+    def build(self, model):
+        a = model.objects.create(name='A')
+        b = model.objects.create(name='B', parent=a)
+        model.objects.create(name='C', parent=b)
+        model.objects.create(name='D', parent=a)
+        x = model.objects.create(name='X')
+        return a, x
+
+    def test_counts_many_trees_in_one_query(self):
+        a, x = self.build(Node)
+        with self.assertNumQueries(1):
+            stats = Node.objects.tree_stats()
+        self.assertEqual({a._tree_id: TreeSummary(4, 2, 2), x._tree_id: TreeSummary(1, 0, 1)}, stats)
+        self.assertEqual({x._tree_id: TreeSummary(1, 0, 1)}, Node.objects.tree_stats([x._tree_id]))
+        self.assertEqual({}, Node.objects.tree_stats([]))
+
+    def test_counts_leaves_from_parents_without_dense_edges(self):
+        for model in (SparseNode, ClosureNode):
+            a, x = self.build(model)
+            self.assertEqual(TreeSummary(4, 2, 2), model.objects.tree_stats([a._tree_id])[a._tree_id])
+
+    def test_max_tree_depth_uses_aggregate(self):
+        a, _ = self.build(Node)
+        self.assertEqual(2, Node.objects.get(name='D').max_tree_depth)
+
+
+class TreeSummaryTests(TestCase):
+
+    def setUp(self):
+        self.a = SummaryNode.objects.create(name='A')
+        self.b = SummaryNode.objects.create(name='B', parent=self.a)
+        self.c = SummaryNode.objects.create(name='C', parent=self.b)
+        self.d = SummaryNode.objects.create(name='D', parent=self.a)
+
+    def summary(self, node):
+        tree_id = SummaryNode.objects.get(pk=node.pk)._tree_id
+        return SummaryNode.objects.tree_stats([tree_id])[tree_id]
+
+    def assertSummaryIsCurrent(self):
+        counted = SummaryNode.objects._count_trees()
+        self.assertEqual(counted, SummaryNode.objects.tree_stats())
+
+    def test_new_root_starts_with_its_own_summary(self):
+        x = SummaryNode.objects.create(name='X')
+        with self.assertNumQueries(1):
+            self.assertEqual({x._tree_id: TreeSummary(1, 0, 1)}, SummaryNode.objects.tree_stats([x._tree_id]))
+
+    def test_inserts_update_summary_without_recount(self):
+        SummaryNode.objects.create(name='E', parent=self.c)
+        with self.assertNumQueries(1):
+            stats = SummaryNode.objects.tree_stats([self.a._tree_id])
+        self.assertEqual(TreeSummary(5, 3, 2), stats[self.a._tree_id])
+        SummaryNode.objects.create(name='F', parent=self.d)
+        SummaryNode.objects.create(name='G', parent=self.d)
+        self.assertEqual(TreeSummary(7, 3, 3), self.summary(self.a))
+
+    def test_summary_is_updated_without_reading_the_updated_table(self):
+        with CaptureQueriesContext(connection) as queries:
+            SummaryNode.objects.create(name='E', parent=self.c)
+            SummaryNode.objects.create(name='F', parent=self.c)
+        updates = [query['sql'] for query in queries if 'UPDATE "' in query['sql']]
+        self.assertTrue(updates)
+        self.assertFalse([sql for sql in updates if 'SELECT' in sql])
+        self.assertEqual(TreeSummary(6, 3, 3), self.summary(self.a))
+        self.assertSummaryIsCurrent()
+
+    def test_moves_and_bifurcations_are_recounted(self):
+        self.c.move(self.d)
+        self.assertSummaryIsCurrent()
+        self.b.bifurcate()
+        self.assertSummaryIsCurrent()
+        self.assertEqual(TreeSummary(1, 0, 1), self.summary(self.b))
+        self.c.move(self.b)
+        self.assertSummaryIsCurrent()
+        self.assertEqual(TreeSummary(2, 1, 1), self.summary(self.b))
+        with self.assertNumQueries(1):
+            SummaryNode.objects.tree_stats()
+
+    def test_deletes_and_rebuilds_are_recounted(self):
+        SummaryNode.objects.get(pk=self.b.pk).delete()
+        self.assertEqual(TreeSummary(2, 1, 1), self.summary(self.a))
+        with SummaryNode.objects.delay_tree_updates():
+            SummaryNode.objects.create(name='E', parent=self.d)
+        self.assertSummaryIsCurrent()
+        SummaryNode.objects.bulk_create_tree([(SummaryNode(name='F'), [])], parent=self.a)
+        self.assertSummaryIsCurrent()
@@ -10,7 +10,7 @@ setup(
     long_description=file('README.rst').read(),
     url='https://github.com/imtapps/django-trees',
     install_requires=file('requirements.txt').read(),
-    packages=find_packages(exclude=('project', )),
+    packages=find_packages(exclude=('project', 'benchmarks')),
     classifiers=[
         'Development Status :: 5 - Production/Stable',
         'Framework :: Django',